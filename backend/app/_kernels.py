@@ -0,0 +1,57 @@
+"""
+Per-vertex blend kernel, JIT-compiled with Numba when it is installed.
+
+The kernel writes into a caller-provided ``out`` buffer in a single pass,
+so no intermediate arrays are allocated. Without Numba the NumPy
+fallback is used; it produces the same results.
+
+It is called from concurrent request threads, so it is compiled
+without ``parallel=True``: Numba's workqueue threading layer (used when TBB
+and OpenMP are missing) aborts the process on concurrent parallel calls.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+# Try to import Numba (optional JIT compiler)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
+
+def _blend_shape_numpy(
+    v_template: np.ndarray, shapedirs_2d: np.ndarray, betas: np.ndarray, out: np.ndarray
+) -> np.ndarray:
+    """NumPy version of _blend_shape_loop."""
+    np.matmul(shapedirs_2d, betas, out=out)
+    out += v_template
+    return out
+
+
+def _blend_shape_loop(v_template, shapedirs_2d, betas, out):
+    """
+    Write ``v_template + shapedirs_2d @ betas`` into ``out``.
+
+    Args:
+        v_template: Flattened template vertices (V*3,), float32
+        shapedirs_2d: Blend shapes (V*3, num_betas), float32
+        betas: Shape parameters (num_betas,), float32
+        out: Output buffer (V*3,), float32
+    """
+    rows, num_betas = shapedirs_2d.shape
+    for i in range(rows):
+        acc = v_template[i]
+        for j in range(num_betas):
+            acc += shapedirs_2d[i, j] * betas[j]
+        out[i] = acc
+    return out
+
+
+if NUMBA_AVAILABLE:
+    # cache=True keeps the compiled kernel in __pycache__ across worker restarts
+    blend_shape = njit(cache=True, fastmath=True)(_blend_shape_loop)
+else:
+    blend_shape = _blend_shape_numpy
@@ -3,25 +3,50 @@ DEXA metric → SMPL-X parameter conversion utilities.
 """
 from __future__ import annotations
 
-import json
 import os
+import struct
 from pathlib import Path
-from typing import Dict, Optional, Tuple
-from uuid import uuid4
+from secrets import token_hex
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
+import orjson
 import trimesh
 from trimesh.creation import icosphere
 
 from .models import AvatarGenerationResponse, AvatarParameters, DexaScanData
-from .smplx_loader import generate_smplx_mesh
+from .smplx_loader import generate_smplx_mesh, generate_smplx_meshes
 
 
-SMPLX_MODEL_DIR = Path(os.getenv("SMPLX_MODEL_DIR", Path("models")))
 OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", Path("output")))
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+# glTF component types and buffer targets
+_GL_UNSIGNED_SHORT = 5123
+_GL_UNSIGNED_INT = 5125
+_GL_FLOAT = 5126
+_GL_ARRAY_BUFFER = 34962
+_GL_ELEMENT_ARRAY_BUFFER = 34963
+
+# Unit sphere shared by every placeholder mesh; subdividing it per request is costly
+_UNIT_ICOSPHERE = icosphere(subdivisions=4, radius=1.0)
+
+# Reference value and spread used to normalize each beta's source metric:
+#   beta[0] total body fat %     (overall shape, thin to heavy)
+#   beta[1] height cm            (stature)
+#   beta[2] lean mass kg         (muscle definition)
+#   beta[3] weight kg            (overall scale)
+#   beta[4] android fat %        (waist/abdomen)
+#   beta[5] gynoid fat %         (hips/thighs)
+#   beta[6] arms fat %
+#   beta[7] legs fat %
+#   beta[8] trunk fat %
+#   beta[9] bone mass kg         (frame size)
+_BETA_CENTERS = np.array([25.0, 170.0, 50.0, 70.0, 30.0, 35.0, 25.0, 30.0, 30.0, 3.0])
+_BETA_SCALES = np.array([15.0, 20.0, 20.0, 20.0, 15.0, 15.0, 15.0, 15.0, 15.0, 1.5])
+
+
 def _normalize(value: Optional[float], reference: float) -> float:
     if value is None:
         return 0.0
@@ -41,62 +66,33 @@ def map_metrics_to_parameters(dexa_data: DexaScanData, body_scale_adjustments: O
     We map DEXA metrics to these parameters based on body composition.
     """
     body = dexa_data.body_metrics
-    betas = np.zeros(10, dtype=np.float32)
-
-    # Beta 0: Overall body shape (based on body fat %)
-    # Higher fat % = more rounded/heavier shape
-    if body.total_fat_percent is not None:
-        # Normalize to -2 to +2 range (SMPL-X typical range)
-        fat_normalized = (body.total_fat_percent - 25.0) / 15.0  # Center at 25%, scale by 15%
-        betas[0] = np.clip(fat_normalized, -2.0, 2.0)
-    
-    # Beta 1: Height/stature
-    if body.height_cm is not None:
-        # Normalize around 170cm (average)
-        height_normalized = (body.height_cm - 170.0) / 20.0
-        betas[1] = np.clip(height_normalized, -2.0, 2.0)
-    
-    # Beta 2: Muscle definition (based on lean mass)
-    if body.total_lean_mass_kg is not None:
-        # Higher lean mass = more muscular
-        lean_normalized = (body.total_lean_mass_kg - 50.0) / 20.0
-        betas[2] = np.clip(lean_normalized, -2.0, 2.0)
-    
-    # Beta 3: Weight/overall scale
-    if body.weight_kg is not None:
-        weight_normalized = (body.weight_kg - 70.0) / 20.0
-        betas[3] = np.clip(weight_normalized, -2.0, 2.0)
-    
-    # Beta 4: Android fat distribution (waist/abdomen)
-    if "android" in dexa_data.regions and dexa_data.regions["android"].fat_percent is not None:
-        android_fat = dexa_data.regions["android"].fat_percent
-        android_normalized = (android_fat - 30.0) / 15.0
-        betas[4] = np.clip(android_normalized, -2.0, 2.0)
-    
-    # Beta 5: Gynoid fat distribution (hips/thighs)
-    if "gynoid" in dexa_data.regions and dexa_data.regions["gynoid"].fat_percent is not None:
-        gynoid_fat = dexa_data.regions["gynoid"].fat_percent
-        gynoid_normalized = (gynoid_fat - 35.0) / 15.0
-        betas[5] = np.clip(gynoid_normalized, -2.0, 2.0)
-    
-    # Beta 6-9: Regional adjustments based on arm/leg/trunk measurements
-    if "arms" in dexa_data.regions and dexa_data.regions["arms"].fat_percent is not None:
-        arm_fat = dexa_data.regions["arms"].fat_percent
-        betas[6] = np.clip((arm_fat - 25.0) / 15.0, -2.0, 2.0)
-    
-    if "legs" in dexa_data.regions and dexa_data.regions["legs"].fat_percent is not None:
-        leg_fat = dexa_data.regions["legs"].fat_percent
-        betas[7] = np.clip((leg_fat - 30.0) / 15.0, -2.0, 2.0)
-    
-    if "trunk" in dexa_data.regions and dexa_data.regions["trunk"].fat_percent is not None:
-        trunk_fat = dexa_data.regions["trunk"].fat_percent
-        betas[8] = np.clip((trunk_fat - 30.0) / 15.0, -2.0, 2.0)
-    
-    # Beta 9: Overall body proportion (can be used for additional adjustments)
-    if body.total_bone_mass_kg is not None:
-        # Bone mass affects overall frame size
-        bone_normalized = (body.total_bone_mass_kg - 3.0) / 1.5
-        betas[9] = np.clip(bone_normalized, -2.0, 2.0)
+    regions = dexa_data.regions
+
+    def _region_fat(name: str) -> Optional[float]:
+        region = regions.get(name)
+        return region.fat_percent if region is not None else None
+
+    # One input per beta, in the order of _BETA_CENTERS / _BETA_SCALES
+    inputs = (
+        body.total_fat_percent,
+        body.height_cm,
+        body.total_lean_mass_kg,
+        body.weight_kg,
+        _region_fat("android"),
+        _region_fat("gynoid"),
+        _region_fat("arms"),
+        _region_fat("legs"),
+        _region_fat("trunk"),
+        body.total_bone_mass_kg,
+    )
+    present = np.array([value is not None for value in inputs])
+    values = np.array(
+        [value if value is not None else 0.0 for value in inputs], dtype=np.float64
+    )
+
+    # Normalize to the -2 to +2 range (SMPL-X typical); missing metrics stay 0
+    normalized = np.clip((values - _BETA_CENTERS) / _BETA_SCALES, -2.0, 2.0)
+    betas = np.where(present, normalized, 0.0).astype(np.float32)
 
     # Apply body scale adjustments from photo personalization
     scales = body_scale_adjustments or {}
@@ -110,7 +106,8 @@ def map_metrics_to_parameters(dexa_data: DexaScanData, body_scale_adjustments: O
         overall_scale = np.clip(overall_scale, 0.7, 1.3)
         scales["overall"] = overall_scale
 
-    return AvatarParameters(
+    # Values are derived from already-validated metrics; skip re-validation
+    return AvatarParameters.construct(
         betas=betas.tolist(),
         scales=scales,
         notes="SMPL-X parameters generated from DEXA metrics with improved mapping",
@@ -118,25 +115,164 @@ def map_metrics_to_parameters(dexa_data: DexaScanData, body_scale_adjustments: O
 
 
 def _create_placeholder_mesh(scale: float = 1.0) -> trimesh.Trimesh:
-    mesh = icosphere(subdivisions=4, radius=scale)
-    mesh.apply_scale([0.7, 1.2, 0.5])  # elongated to mimic a torso
-    return mesh
+    # elongated to mimic a torso
+    vertices = _UNIT_ICOSPHERE.vertices * (np.array([0.7, 1.2, 0.5]) * scale)
+    return trimesh.Trimesh(vertices=vertices, faces=_UNIT_ICOSPHERE.faces, process=False)
+
+
+def _quantize_positions(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Map positions onto the normalized unsigned 16-bit grid of their bounding box.
+
+    Returns (quantized, offset, scale) with positions ~= offset + scale * quantized / 65535.
+    The scale is uniform so the dequantizing node transform doesn't skew the mesh.
+    """
+    offset = positions.min(axis=0)
+    scale = float((positions.max(axis=0) - offset).max()) or 1.0
+    # Vertex attribute elements must be 4-byte aligned, so VEC3 shorts carry a pad lane
+    quantized = np.zeros((len(positions), 4), dtype="<u2")
+    quantized[:, :3] = np.rint((positions - offset) * (65535.0 / scale))
+    return quantized, offset, scale
+
+
+def _glb_bytes(
+    mesh: trimesh.Trimesh,
+    morph_targets: Sequence[np.ndarray] = (),
+    quantize: bool = False,
+) -> bytes:
+    """
+    Serialize a single mesh as a GLB container (glTF 2.0 binary).
+
+    Only positions and triangle indices are written, which is all the
+    viewer needs, so the generic scene-graph exporter is skipped. Each
+    entry of ``morph_targets`` is a per-vertex position delta stored as a
+    glTF morph target; all target weights default to 0. With ``quantize``,
+    positions are stored as normalized 16-bit integers (KHR_mesh_quantization)
+    and dequantized by the node transform.
+    """
+    positions = np.asarray(mesh.vertices, dtype=np.float64)
+    deltas = [np.asarray(target, dtype=np.float64) for target in morph_targets]
+    node = {"mesh": 0}
+
+    # Indices fit in 16 bits for SMPL-X and the placeholder (65535 is reserved for restart)
+    if len(positions) < 65535:
+        indices = np.ascontiguousarray(mesh.faces, dtype="<u2")
+        index_type = _GL_UNSIGNED_SHORT
+    else:
+        indices = np.ascontiguousarray(mesh.faces, dtype="<u4")
+        index_type = _GL_UNSIGNED_INT
+    index_bytes = indices.tobytes()
+    index_bytes += b"\x00" * (-len(index_bytes) % 4)
+
+    # (bytes, bufferView target, byteStride) per section, in buffer order
+    sections = [(index_bytes, _GL_ELEMENT_ARRAY_BUFFER, None)]
+    accessors = [
+        {"bufferView": 0, "componentType": index_type, "count": int(indices.size), "type": "SCALAR"}
+    ]
+
+    if quantize:
+        quantized, offset, scale = _quantize_positions(positions)
+        node["translation"] = offset.tolist()
+        node["scale"] = [scale] * 3
+        # Targets are in the same pre-transform space as the quantized positions
+        deltas = [delta / scale for delta in deltas]
+        sections.append((quantized.tobytes(), _GL_ARRAY_BUFFER, 8))
+        accessors.append(
+            {
+                "bufferView": 1,
+                "componentType": _GL_UNSIGNED_SHORT,
+                "normalized": True,
+                "count": len(quantized),
+                "type": "VEC3",
+                "min": quantized[:, :3].min(axis=0).tolist(),
+                "max": quantized[:, :3].max(axis=0).tolist(),
+            }
+        )
+    else:
+        deltas = [positions] + deltas
+
+    for array in deltas:
+        array = np.ascontiguousarray(array, dtype="<f4")
+        sections.append((array.tobytes(), _GL_ARRAY_BUFFER, None))
+        # min/max are mandatory for POSITION accessors, including morph targets
+        accessors.append(
+            {
+                "bufferView": len(accessors),
+                "componentType": _GL_FLOAT,
+                "count": len(array),
+                "type": "VEC3",
+                "min": array.min(axis=0).tolist(),
+                "max": array.max(axis=0).tolist(),
+            }
+        )
+
+    buffer_views = []
+    offset_bytes = 0
+    for section, target, stride in sections:
+        view = {"buffer": 0, "byteOffset": offset_bytes, "byteLength": len(section), "target": target}
+        if stride is not None:
+            view["byteStride"] = stride
+        buffer_views.append(view)
+        offset_bytes += len(section)
+
+    primitive = {"attributes": {"POSITION": 1}, "indices": 0, "mode": 4}
+    gltf_mesh = {"primitives": [primitive]}
+    if len(morph_targets):
+        primitive["targets"] = [{"POSITION": 2 + idx} for idx in range(len(morph_targets))]
+        gltf_mesh["weights"] = [0.0] * len(morph_targets)
 
+    gltf = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [node],
+        "meshes": [gltf_mesh],
+        "accessors": accessors,
+        "bufferViews": buffer_views,
+        "buffers": [{"byteLength": offset_bytes}],
+    }
+    if quantize:
+        gltf["extensionsUsed"] = gltf["extensionsRequired"] = ["KHR_mesh_quantization"]
 
-def _export_glb(mesh: trimesh.Trimesh, destination: Path) -> None:
+    json_chunk = orjson.dumps(gltf)
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    # Every section is padded to 4 bytes, so the binary chunk is already aligned
+    total_length = 12 + 8 + len(json_chunk) + 8 + offset_bytes
+
+    return b"".join(
+        [
+            struct.pack("<4sII", b"glTF", 2, total_length),
+            struct.pack("<I4s", len(json_chunk), b"JSON"),
+            json_chunk,
+            struct.pack("<I4s", offset_bytes, b"BIN\x00"),
+        ]
+        + [section for section, _, _ in sections]
+    )
+
+
+def _export_glb(
+    mesh: trimesh.Trimesh, destination: Path, morph_targets: Sequence[np.ndarray] = ()
+) -> None:
     destination.parent.mkdir(parents=True, exist_ok=True)
-    scene = trimesh.Scene(mesh)
-    scene.export(destination, file_type="glb")
+    # Write then rename so readers polling for the file never see a partial GLB
+    partial = destination.with_name(destination.name + ".part")
+    partial.write_bytes(_glb_bytes(mesh, morph_targets, quantize=True))
+    os.replace(partial, destination)
 
 
-def generate_avatar_assets(parameters: AvatarParameters) -> Tuple[str, str, str]:
+def reserve_avatar_id() -> Tuple[str, str]:
     """
-    Produce a GLB file using SMPL-X if available, otherwise placeholder.
-    Returns tuple of (avatar_id, glb_path, metadata_path) as relative paths.
+    Allocate a new avatar id.
+    Returns tuple of (avatar_id, glb_path), where glb_path is the relative
+    path the GLB will be written to by export_avatar_assets.
     """
 
-    avatar_id = uuid4().hex
-    glb_path = OUTPUT_DIR / f"{avatar_id}.glb"
+    avatar_id = token_hex(16)
+    return avatar_id, f"output/{avatar_id}.glb"
+
+
+def _generate_avatar_mesh(parameters: AvatarParameters) -> trimesh.Trimesh:
+    """Build the in-memory mesh for a parameter set, using SMPL-X if available."""
 
     # Convert betas to numpy array
     betas = np.array(parameters.betas, dtype=np.float32) if parameters.betas else np.zeros(10, dtype=np.float32)
@@ -152,21 +288,60 @@ def generate_avatar_assets(parameters: AvatarParameters) -> Tuple[str, str, str]
         scale = overall_scale * (1.0 + float(betas[0]) * 0.1 if len(betas) > 0 else 1.0)
         mesh = _create_placeholder_mesh(scale)
     
-    # Apply regional scale adjustments if provided
-    if parameters.scales:
-        for region, scale_factor in parameters.scales.items():
-            if region != "overall":
-                # Apply regional scaling (simplified - would need vertex selection in full implementation)
-                pass  # TODO: Implement regional vertex scaling
-    
-    _export_glb(mesh, glb_path)
+    # TODO: Apply regional (non-"overall") scale adjustments; needs per-region vertex selection
+
+    return mesh
+
+
+def _generate_avatar_meshes(parameter_sets: List[AvatarParameters]) -> List[trimesh.Trimesh]:
+    """Build meshes for several parameter sets with a single batched SMPL-X pass."""
+
+    betas_rows = [parameters.betas or [0.0] * 10 for parameters in parameter_sets]
+    betas_batch = np.zeros((len(betas_rows), max(map(len, betas_rows))), dtype=np.float32)
+    for row, betas in zip(betas_batch, betas_rows):
+        row[: len(betas)] = betas
+    scales = [
+        parameters.scales.get("overall", 1.0) if parameters.scales else 1.0
+        for parameters in parameter_sets
+    ]
+
+    meshes = generate_smplx_meshes(betas_batch, scales=scales, use_smplx=True)
+
+    # Fallback to placeholders if SMPL-X not available
+    if meshes is None:
+        meshes = [_generate_avatar_mesh(parameters) for parameters in parameter_sets]
+
+    return meshes
+
+
+def export_avatar_assets(avatar_id: str, parameters: AvatarParameters) -> Tuple[str, str]:
+    """
+    Build the mesh for a reserved avatar id and write its GLB and metadata.
+    Returns tuple of (glb_path, metadata_path) as relative paths.
+    """
+
+    glb_path = OUTPUT_DIR / f"{avatar_id}.glb"
+    _export_glb(_generate_avatar_mesh(parameters), glb_path)
 
     metadata_path = OUTPUT_DIR / f"{avatar_id}.json"
-    metadata_path.write_text(json.dumps(parameters.dict(), indent=2))
+    metadata_path.write_bytes(
+        orjson.dumps(parameters.__dict__, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    )
 
     # Return relative paths for API responses
     glb_relative = f"output/{avatar_id}.glb"
     metadata_relative = f"output/{avatar_id}.json"
+    return glb_relative, metadata_relative
+
+
+def generate_avatar_assets(parameters: AvatarParameters) -> Tuple[str, str, str]:
+    """
+    Produce a GLB file using SMPL-X if available, otherwise placeholder.
+    Returns tuple of (avatar_id, glb_path, metadata_path) as relative paths.
+    """
+
+    avatar_id, _ = reserve_avatar_id()
+    glb_relative, metadata_relative = export_avatar_assets(avatar_id, parameters)
     return avatar_id, glb_relative, metadata_relative
 
 
@@ -176,7 +351,7 @@ def process_dexa_to_avatar(
 ) -> AvatarGenerationResponse:
     parameters = map_metrics_to_parameters(dexa_data, body_scale_adjustments)
     avatar_id, glb_path, metadata_path = generate_avatar_assets(parameters)
-    return AvatarGenerationResponse(
+    return AvatarGenerationResponse.construct(
         avatar_id=avatar_id,
         glb_path=glb_path,
         preview_image_path=None,
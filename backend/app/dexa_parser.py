@@ -3,109 +3,257 @@ Utilities for parsing DEXA scan PDFs into structured metrics.
 """
 from __future__ import annotations
 
-import io
+import multiprocessing
 import re
-from datetime import datetime
-from typing import Dict, Optional, Tuple
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional
 
-import pdfplumber
+import pypdfium2 as pdfium
 
 from .models import DexaBodyMetrics, DexaRegionMetrics, DexaScanData
 
 
-METRIC_PATTERNS: Dict[str, re.Pattern[str]] = {
-    "total_fat_percent": re.compile(r"total\s+body\s+fat\s*%?\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I),
-    "total_lean_mass_kg": re.compile(r"lean\s+mass\s*\(kg\)\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I),
-    "total_bone_mass_kg": re.compile(
-        r"(?:bone\s+mass|bmd)\s*\(kg\)\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I
-    ),
-    "weight_kg": re.compile(r"weight\s*\(kg\)\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I),
-    "height_cm": re.compile(r"height\s*\(cm\)\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I),
-    "android_fat_percent": re.compile(r"android\s+fat\s*%?\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I),
-    "gynoid_fat_percent": re.compile(r"gynoid\s+fat\s*%?\s*[:\-]?\s*(\d+(?:\.\d+)?)", re.I),
+_NUMBER = r"\d+(?:\.\d+)?"
+
+_METRIC_LABELS: Dict[str, str] = {
+    "total_fat_percent": r"total\s+body\s+fat\s*%?",
+    "total_lean_mass_kg": r"lean\s+mass\s*\(kg\)",
+    "total_bone_mass_kg": r"(?:bone\s+mass|bmd)\s*\(kg\)",
+    "weight_kg": r"weight\s*\(kg\)",
+    "height_cm": r"height\s*\(cm\)",
+    "android_fat_percent": r"android\s+fat\s*%?",
+    "gynoid_fat_percent": r"gynoid\s+fat\s*%?",
 }
 
+# All primary metrics fused into one alternation so the text is scanned once;
+# the named group of each branch captures that metric's numeric value.
+METRICS_RE: re.Pattern[str] = re.compile(
+    "|".join(
+        rf"{label}\s*[:\-]?\s*(?P<{key}>{_NUMBER})" for key, label in _METRIC_LABELS.items()
+    ),
+    re.I,
+)
+
+# Glyph clustering tolerances (PDF points), matching pdfplumber's defaults.
+_X_TOLERANCE = 3.0
+_Y_TOLERANCE = 3.0
+
+# Reports with at least this many pages are extracted in parallel
+_PARALLEL_MIN_PAGES = 8
+_PAGE_WORKERS = 4
+
 REGION_NAMES = ["arms", "legs", "trunk", "android", "gynoid"]
 
+# Report metadata fused into one alternation, scanned once like METRICS_RE
+# Labels of the other metadata fields; the device capture stops before them
+# because header fields often share one line and finditer matches can't overlap
+_OTHER_LABELS = r"patient\s+id|(?:scan|report)\s+date"
+_METADATA_RE = re.compile(
+    r"patient\s+id\s*[:\-]?\s*(?P<patient_id>[A-Za-z0-9_-]+)"
+    r"|(?:scan|report)\s+date\s*[:\-]?\s*(?P<scan_date>[0-9]{1,2}/[0-9]{1,2}/[0-9]{2,4})"
+    rf"|(?:device|model)\s*[:\-]?\s*(?P<device_model>(?:(?!{_OTHER_LABELS})[A-Za-z0-9 \t-])+)",
+    re.I,
+)
+
+_NUMBER_RE = re.compile(_NUMBER)
+# Table columns are separated by runs of spaces or tabs
+_COLUMN_SPLIT_RE = re.compile(r"\s{2,}|\t")
+_REGION_SET = frozenset(REGION_NAMES)
+
+# Serializes PDFium use within this process
+_PDFIUM_LOCK = threading.Lock()
+
 
 class DexaParserError(RuntimeError):
     """Raised when the parser cannot recover meaningful metrics."""
 
 
-def _extract_first(pattern: re.Pattern[str], text: str) -> Optional[float]:
-    match = pattern.search(text)
-    if match:
-        try:
-            return float(match.group(1))
-        except ValueError:
-            return None
-    return None
+def _extract_body_metrics(text: str) -> Dict[str, Optional[float]]:
+    metrics: Dict[str, Optional[float]] = dict.fromkeys(_METRIC_LABELS)
+    for match in METRICS_RE.finditer(text):
+        key = match.lastgroup
+        # Keep the first occurrence of each metric.
+        if metrics[key] is None:
+            metrics[key] = float(match.group(key))
+    return metrics
+
+
+def _extract_metadata(text: str) -> Dict[str, Optional[str]]:
+    metadata: Dict[str, Optional[str]] = dict.fromkeys(("patient_id", "scan_date", "device_model"))
+    for match in _METADATA_RE.finditer(text):
+        key = match.lastgroup
+        if metadata[key] is None:
+            metadata[key] = match.group(key).strip()
+    return metadata
+
+
+def _parse_scan_date(raw: str) -> Optional[str]:
+    """
+    Parse a numeric scan date as an ISO date.
+
+    Four-digit years are read month-first unless the first field cannot be
+    a month, in which case day-first; two-digit years are month-first only.
+    """
+    first, second, year_text = raw.split("/")
+    first, second, year = int(first), int(second), int(year_text)
+    if len(year_text) == 4:
+        month, day = (first, second) if first <= 12 else (second, first)
+    elif len(year_text) == 2:
+        # Same pivot as strptime's %y
+        year += 1900 if year >= 69 else 2000
+        month, day = first, second
+    else:
+        return None
+
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
 
 
 def _extract_region_metrics(text: str) -> Dict[str, DexaRegionMetrics]:
     regions: Dict[str, DexaRegionMetrics] = {}
-    lines = [line.strip() for line in text.splitlines() if line.strip()]
-    tokenized = [re.split(r"\s{2,}|\t", line) for line in lines]
 
-    for tokens in tokenized:
-        if not tokens:
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
             continue
 
-        key = tokens[0].lower()
-        if any(region in key for region in REGION_NAMES):
-            values = [float(val) for val in re.findall(r"\d+(?:\.\d+)?", " ".join(tokens[1:]))]
+        tokens = _COLUMN_SPLIT_RE.split(line)
+        key = tokens[0].lower().rstrip(":")
+        if key in _REGION_SET:
+            values = [float(val) for val in _NUMBER_RE.findall(" ".join(tokens[1:]))]
             if values:
-                fat_percent = values[0] if values else None
                 regions[key] = DexaRegionMetrics(
-                    fat_percent=fat_percent,
+                    fat_percent=values[0],
                     lean_mass_kg=values[1] if len(values) > 1 else None,
                     bone_mass_kg=values[2] if len(values) > 2 else None,
                 )
     return regions
 
 
+def _page_text(textpage: pdfium.PdfTextPage) -> str:
+    """
+    Rebuild reading-order lines from PDFium character boxes.
+
+    PDFium returns text in content-stream order, which on DEXA reports
+    separates table labels from their values. Glyphs are regrouped into
+    lines by their top edge and ordered left-to-right, the same way
+    pdfplumber lays out text.
+    """
+    # An explicit count keeps pypdfium2 4.x from redirecting to get_text_bounded(),
+    # whose indices don't line up with get_charbox()
+    text = textpage.get_text_range(0, textpage.count_chars())
+    # [negated top, left, right, glyph, followed by a space]
+    glyphs: List[List] = []
+    for index, char in enumerate(text):
+        if char.isspace():
+            if char == " " and glyphs:
+                glyphs[-1][4] = True
+            continue
+        left, _, right, top = textpage.get_charbox(index, loose=True)
+        glyphs.append([-top, left, right, char, False])
+    glyphs.sort()
+
+    lines: List[List[List]] = []
+    previous_top = None
+    for glyph in glyphs:
+        if previous_top is None or glyph[0] - previous_top > _Y_TOLERANCE:
+            lines.append([])
+        lines[-1].append(glyph)
+        previous_top = glyph[0]
+
+    rendered: List[str] = []
+    for line in lines:
+        line.sort(key=lambda glyph: glyph[1])
+        parts: List[str] = []
+        previous = None
+        for glyph in line:
+            if previous is not None and (
+                previous[4] or glyph[1] - previous[2] > _X_TOLERANCE
+            ):
+                parts.append(" ")
+            parts.append(glyph[3])
+            previous = glyph
+        rendered.append("".join(parts))
+    return "\n".join(rendered)
+
+
+def _extract_page_range(pdf_bytes: bytes, start: int, stop: int) -> str:
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        return "\n".join(_page_text(pdf[index].get_textpage()) for index in range(start, stop))
+    finally:
+        pdf.close()
+
+
+@lru_cache(maxsize=1)
+def _page_pool() -> ProcessPoolExecutor:
+    # Spawned, not forked: the parent is multi-threaded and may hold _PDFIUM_LOCK
+    return ProcessPoolExecutor(
+        max_workers=_PAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def shutdown_page_pool() -> None:
+    """Stop the page-extraction worker processes, if any were started."""
+    if _page_pool.cache_info().currsize:
+        _page_pool().shutdown(wait=False, cancel_futures=True)
+        _page_pool.cache_clear()
+
+
+def _extract_text(pdf_bytes: bytes) -> str:
+    # Requests are parsed in worker threads, but pypdfium2 forbids calls from
+    # different threads at once (even on separate documents)
+    with _PDFIUM_LOCK:
+        try:
+            pdf = pdfium.PdfDocument(pdf_bytes)
+        except pdfium.PdfiumError as e:
+            raise DexaParserError(f"Unable to open PDF: {e}") from e
+
+        # PdfDocument is not a context manager in the pinned pypdfium2 4.x
+        try:
+            page_count = len(pdf)
+            # Worker processes (e.g. the batch pool) don't nest a pool of their
+            # own, which would keep them from exiting
+            if page_count < _PARALLEL_MIN_PAGES or multiprocessing.parent_process() is not None:
+                return "\n".join(_page_text(page.get_textpage()) for page in pdf)
+        finally:
+            pdf.close()
+
+    # PDFium is not thread-safe, so long reports are split across processes
+    chunk = -(-page_count // _PAGE_WORKERS)
+    futures = [
+        _page_pool().submit(_extract_page_range, pdf_bytes, start, min(start + chunk, page_count))
+        for start in range(0, page_count, chunk)
+    ]
+    return "\n".join(future.result() for future in futures)
+
+
 def parse_pdf_bytes(pdf_bytes: bytes) -> DexaScanData:
     """
     Parse a DEXA PDF (provided as bytes) into a DexaScanData object.
     """
 
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        pages_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+    pages_text = _extract_text(pdf_bytes)
 
     if not pages_text.strip():
         raise DexaParserError("Unable to read text from PDF")
 
-    body_kwargs = {
-        key: _extract_first(pattern, pages_text) for key, pattern in METRIC_PATTERNS.items()
-    }
+    body_kwargs = _extract_body_metrics(pages_text)
 
     if not any(body_kwargs.values()):
         raise DexaParserError("Failed to extract primary DEXA metrics")
 
     regions = _extract_region_metrics(pages_text)
 
-    patient_id = None
-    patient_match = re.search(r"patient\s+id\s*[:\-]?\s*([A-Za-z0-9_-]+)", pages_text, re.I)
-    if patient_match:
-        patient_id = patient_match.group(1)
-
-    scan_date = None
-    date_match = re.search(
-        r"(?:scan|report)\s+date\s*[:\-]?\s*([0-9]{1,2}/[0-9]{1,2}/[0-9]{2,4})", pages_text, re.I
-    )
-    if date_match:
-        raw = date_match.group(1)
-        for fmt in ("%m/%d/%Y", "%d/%m/%Y", "%m/%d/%y"):
-            try:
-                scan_date = datetime.strptime(raw, fmt).date().isoformat()
-                break
-            except ValueError:
-                continue
-
-    device_model = None
-    device_match = re.search(r"(?:device|model)\s*[:\-]?\s*([A-Za-z0-9\s-]+)", pages_text, re.I)
-    if device_match:
-        device_model = device_match.group(1).strip()
+    metadata = _extract_metadata(pages_text)
+    patient_id = metadata["patient_id"]
+    device_model = metadata["device_model"]
+    scan_date = _parse_scan_date(metadata["scan_date"]) if metadata["scan_date"] else None
 
     return DexaScanData(
         patient_id=patient_id,
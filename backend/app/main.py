@@ -4,22 +4,33 @@ FastAPI backend for DEXA → 3D Avatar conversion pipeline.
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from secrets import token_hex
 from typing import Dict, List, Optional
-from uuid import uuid4
 
 from fastapi import FastAPI, File, HTTPException, UploadFile, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from .dexa_parser import parse_pdf_bytes, DexaParserError
-from .avatar_generator import process_dexa_to_avatar
+from .dexa_parser import parse_pdf_bytes, shutdown_page_pool, DexaParserError
+from .avatar_generator import (
+    export_avatar_assets,
+    map_metrics_to_parameters,
+    process_dexa_to_avatar,
+    reserve_avatar_id,
+)
 from .personalization import refine_parameters_with_photo
 from .morphing import handle_morph_request
 from .models import (
     AvatarGenerationRequest,
     AvatarGenerationResponse,
+    AvatarParameters,
     BatchProcessRequest,
     BatchProcessResponse,
     MorphRequest,
@@ -33,11 +44,16 @@ app = FastAPI(
     version="1.0.0",
 )
 
-# CORS middleware for frontend access
+# CORS middleware for frontend access; CORS_ORIGINS is a comma-separated list
+CORS_ORIGINS = tuple(
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()
+)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
+    allow_origins=CORS_ORIGINS,
+    # Browsers reject credentials with a wildcard origin, and honouring them
+    # would force the middleware to echo each request's Origin back
+    allow_credentials="*" not in CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -48,6 +64,45 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 app.mount("/output", StaticFiles(directory=str(OUTPUT_DIR)), name="output")
 
 
+# Worker processes for batch jobs; parsing and GLB export are CPU-bound.
+# Spawned rather than forked: the server process is multi-threaded (PDFium and
+# MediaPipe locks, torch) and a fork copies whatever state those threads hold
+_BATCH_POOL = ProcessPoolExecutor(
+    max_workers=os.cpu_count(),
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
+
+@app.on_event("shutdown")
+def _shutdown_batch_pool() -> None:
+    _BATCH_POOL.shutdown(wait=False, cancel_futures=True)
+    shutdown_page_pool()
+
+
+# Most recently generated avatars, keyed by SHA-256 of the uploaded PDF (and photo)
+_AVATAR_CACHE: OrderedDict[str, AvatarGenerationResponse] = OrderedDict()
+_AVATAR_CACHE_SIZE = 256
+
+
+def _error_marker(avatar_id: str) -> Path:
+    """Path of the file recording why a background export failed."""
+    return OUTPUT_DIR / f"{avatar_id}.error"
+
+
+def _export_or_record_error(avatar_id: str, parameters: AvatarParameters) -> None:
+    """Run export_avatar_assets, writing the failure to an error marker if it raises."""
+    try:
+        export_avatar_assets(avatar_id, parameters)
+    except Exception as e:
+        _error_marker(avatar_id).write_text(str(e) or type(e).__name__)
+
+
+def _parse_and_generate(pdf_path: str) -> str:
+    """Parse a DEXA PDF from disk and build its avatar. Runs in a worker process."""
+    dexa_data = parse_pdf_bytes(Path(pdf_path).read_bytes())
+    return process_dexa_to_avatar(dexa_data).avatar_id
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -61,15 +116,18 @@ async def parse_dexa_pdf(file: UploadFile = File(...)):
     
     Note: This endpoint operates entirely in-memory:
     - UploadFile.read() loads file content into memory
-    - parse_pdf_bytes() uses BytesIO (in-memory buffer)
+    - parse_pdf_bytes() reads the PDF from the in-memory bytes
     - No file system operations occur, so FileNotFoundError cannot be raised
+
+    Parsing is CPU-bound, so it runs in a worker thread to keep the event
+    loop free for other uploads.
     """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
     try:
         pdf_bytes = await file.read()
-        dexa_data = parse_pdf_bytes(pdf_bytes)
+        dexa_data = await asyncio.to_thread(parse_pdf_bytes, pdf_bytes)
         return dexa_data
     except DexaParserError as e:
         raise HTTPException(status_code=422, detail=f"Failed to parse DEXA PDF: {str(e)}")
@@ -79,32 +137,62 @@ async def parse_dexa_pdf(file: UploadFile = File(...)):
 
 @app.post("/api/generate-avatar", response_model=AvatarGenerationResponse)
 async def generate_avatar(
+    background_tasks: BackgroundTasks,
     dexa_file: UploadFile = File(...),
     body_photo: Optional[UploadFile] = File(None),
     target_body_fat_percent: Optional[float] = None,
 ):
     """
     Generate a 3D avatar from a DEXA scan PDF, optionally with body photo personalization.
+
+    The response is returned as soon as the parameters are known, with
+    status "pending"; the GLB is exported in the background and
+    /api/avatar/{avatar_id}/glb returns 404 until it is ready, or 500 if
+    the export failed.
     """
     try:
-        # Parse DEXA PDF
         pdf_bytes = await dexa_file.read()
-        dexa_data = parse_pdf_bytes(pdf_bytes)
+        photo_bytes = await body_photo.read() if body_photo else None
+
+        # Identical uploads map to the same avatar; reuse it while its GLB exists
+        cache_key = hashlib.sha256(pdf_bytes).hexdigest()
+        if photo_bytes is not None:
+            cache_key += hashlib.sha256(photo_bytes).hexdigest()
+        cached = _AVATAR_CACHE.get(cache_key)
+        if cached is not None and Path(cached.glb_path).exists():
+            _AVATAR_CACHE.move_to_end(cache_key)
+            return cached.copy(update={"status": "ready"})
+
+        # Parse DEXA PDF
+        dexa_data = await asyncio.to_thread(parse_pdf_bytes, pdf_bytes)
 
         # Handle body photo if provided
         body_scale_adjustments = None
-        if body_photo:
-            photo_path = OUTPUT_DIR / f"temp_photo_{uuid4().hex}.jpg"
-            photo_bytes = await body_photo.read()
+        if photo_bytes is not None:
+            photo_path = OUTPUT_DIR / f"temp_photo_{token_hex(16)}.jpg"
             # OUTPUT_DIR is created at module level, so FileNotFoundError should not occur
             # unless there's a permission issue (which would raise PermissionError instead)
             photo_path.write_bytes(photo_bytes)
-            body_scale_adjustments = refine_parameters_with_photo(dexa_data, photo_path)
+            body_scale_adjustments = await asyncio.to_thread(
+                refine_parameters_with_photo, dexa_data, photo_path
+            )
             # Clean up temp file
             photo_path.unlink(missing_ok=True)
 
-        # Generate avatar
-        response = process_dexa_to_avatar(dexa_data, body_scale_adjustments)
+        # Generate avatar; mesh build and GLB export happen after the response is sent
+        parameters = map_metrics_to_parameters(dexa_data, body_scale_adjustments)
+        avatar_id, glb_path = reserve_avatar_id()
+        background_tasks.add_task(_export_or_record_error, avatar_id, parameters)
+        response = AvatarGenerationResponse.construct(
+            avatar_id=avatar_id,
+            glb_path=glb_path,
+            preview_image_path=None,
+            parameters=parameters,
+            status="pending",
+        )
+        _AVATAR_CACHE[cache_key] = response
+        if len(_AVATAR_CACHE) > _AVATAR_CACHE_SIZE:
+            _AVATAR_CACHE.popitem(last=False)
 
         # If target body fat is specified, we could generate a target state here
         # For now, we just return the current state
@@ -132,7 +220,9 @@ async def generate_avatar_from_data(request: AvatarGenerationRequest):
             # For MVP, we'll skip this if it's a URL
             pass
 
-        response = process_dexa_to_avatar(request.dexa_data, body_scale_adjustments)
+        response = await asyncio.to_thread(
+            process_dexa_to_avatar, request.dexa_data, body_scale_adjustments
+        )
         return response
 
     except Exception as e:
@@ -145,20 +235,27 @@ async def morph_avatar(request: MorphRequest):
     Generate a morphing sequence between two avatar states.
     """
     try:
-        response = handle_morph_request(request)
+        response = await asyncio.to_thread(handle_morph_request, request)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
-@app.get("/api/avatar/{avatar_id}/glb")
+@app.api_route("/api/avatar/{avatar_id}/glb", methods=["GET", "HEAD"])
 async def get_avatar_glb(avatar_id: str):
     """
     Retrieve the GLB file for a generated avatar.
+    Returns 404 until a pending avatar has finished exporting, so clients
+    can poll with HEAD, and 500 with the error if its export failed.
     """
+    error_path = _error_marker(avatar_id)
+    if error_path.exists():
+        raise HTTPException(
+            status_code=500, detail=f"Avatar export failed: {error_path.read_text()}"
+        )
     glb_path = OUTPUT_DIR / f"{avatar_id}.glb"
     if not glb_path.exists():
-        raise HTTPException(status_code=404, detail="Avatar not found")
+        raise HTTPException(status_code=404, detail="Avatar not found or still being generated")
     return FileResponse(glb_path, media_type="model/gltf-binary")
 
 
@@ -170,24 +267,29 @@ async def batch_process(
     """
     Process multiple DEXA PDFs in batch. Returns immediately with a job ID.
     """
-    job_id = uuid4().hex
+    job_id = token_hex(16)
     processed: List[str] = []
     failed: Dict[str, str] = {}
 
     async def process_batch():
+        pending: List[str] = []
         for pdf_path in request.pdf_paths:
-            path = Path(pdf_path)
-            if not path.exists():
+            if not Path(pdf_path).exists():
                 failed[pdf_path] = "File not found"
                 continue
-
-            try:
-                pdf_bytes = path.read_bytes()
-                dexa_data = parse_pdf_bytes(pdf_bytes)
-                response = process_dexa_to_avatar(dexa_data)
-                processed.append(response.avatar_id)
-            except Exception as e:
-                failed[pdf_path] = str(e)
+            pending.append(pdf_path)
+
+        # One worker process per PDF, up to the core count
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(_BATCH_POOL, _parse_and_generate, p) for p in pending),
+            return_exceptions=True,
+        )
+        for pdf_path, result in zip(pending, results):
+            if isinstance(result, Exception):
+                failed[pdf_path] = str(result)
+            else:
+                processed.append(result)
 
     background_tasks.add_task(process_batch)
 
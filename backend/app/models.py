@@ -71,6 +71,9 @@ class AvatarGenerationResponse(BaseModel):
     glb_path: str
     preview_image_path: Optional[str]
     parameters: AvatarParameters
+    status: str = Field(
+        default="ready", description="'pending' while the GLB is still being exported"
+    )
 
 
 class MorphRequest(BaseModel):
@@ -85,6 +88,10 @@ class MorphResponse(BaseModel):
     """Result of the morphing pipeline."""
 
     morph_sequence_paths: List[str]
+    morph_weights: Optional[List[float]] = Field(
+        default=None,
+        description="Per-step weight of the GLB's morph target (start + weight * delta)",
+    )
 
 
 class BatchProcessRequest(BaseModel):
@@ -4,13 +4,15 @@ Future-state projection and morphing utilities.
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
+from secrets import token_hex
+from typing import List
 
 import numpy as np
+import orjson
 import trimesh
 
 from .models import AvatarParameters, MorphRequest, MorphResponse
-from .avatar_generator import generate_avatar_assets
+from .avatar_generator import _export_glb, _generate_avatar_meshes
 
 
 def interpolate_parameters(
@@ -22,16 +24,25 @@ def interpolate_parameters(
     if start_betas.shape != end_betas.shape:
         raise ValueError("Parameter vectors must have identical shapes")
 
-    interpolated: List[AvatarParameters] = []
-    for t in np.linspace(0.0, 1.0, steps):
-        betas = start_betas * (1 - t) + end_betas * t
-        scales = {
-            key: start.scales.get(key, 1.0) * (1 - t)
-            + end.scales.get(key, 1.0) * t
-            for key in set(start.scales) | set(end.scales)
-        }
-        interpolated.append(AvatarParameters(betas=betas.tolist(), scales=scales))
-    return interpolated
+    # All steps at once: row i of each matrix is the state at ts[i]
+    ts = np.linspace(0.0, 1.0, steps)[:, None]
+    betas_matrix = (start_betas * (1 - ts) + end_betas * ts).astype(np.float32)
+
+    # Key union and aligned value vectors are built once, not per step
+    keys = list(set(start.scales) | set(end.scales))
+    start_scales = np.fromiter(
+        (start.scales.get(key, 1.0) for key in keys), dtype=np.float64, count=len(keys)
+    )
+    end_scales = np.fromiter(
+        (end.scales.get(key, 1.0) for key in keys), dtype=np.float64, count=len(keys)
+    )
+    scales_matrix = start_scales + ts * (end_scales - start_scales)
+
+    # Convert each matrix to Python lists in one call rather than row by row
+    return [
+        AvatarParameters.construct(betas=betas, scales=dict(zip(keys, scales)))
+        for betas, scales in zip(betas_matrix.tolist(), scales_matrix.tolist())
+    ]
 
 
 def interpolate_meshes(
@@ -56,23 +67,18 @@ def interpolate_meshes(
     if start_mesh.faces.shape != end_mesh.faces.shape:
         raise ValueError("Meshes must have the same face structure")
     
-    interpolated_meshes = []
     start_verts = start_mesh.vertices
     end_verts = end_mesh.vertices
-    
-    for t in np.linspace(0.0, 1.0, steps):
-        # Linear interpolation of vertices
-        interp_verts = start_verts * (1 - t) + end_verts * t
-        
-        # Create new mesh with interpolated vertices
-        interp_mesh = trimesh.Trimesh(
-            vertices=interp_verts,
-            faces=start_mesh.faces.copy(),
-            vertex_normals=start_mesh.vertex_normals.copy() if hasattr(start_mesh, 'vertex_normals') else None
-        )
-        interpolated_meshes.append(interp_mesh)
-    
-    return interpolated_meshes
+
+    # Linear interpolation of every step at once: shape (steps, V, 3)
+    ts = np.linspace(0.0, 1.0, steps)[:, None, None]
+    all_verts = start_verts + ts * (end_verts - start_verts)
+
+    # Faces are shared read-only across steps; normals are recomputed lazily if needed
+    faces = start_mesh.faces
+    return [
+        trimesh.Trimesh(vertices=verts, faces=faces, process=False) for verts in all_verts
+    ]
 
 
 def handle_morph_request(request: MorphRequest, generate_meshes: bool = True) -> MorphResponse:
@@ -81,41 +87,45 @@ def handle_morph_request(request: MorphRequest, generate_meshes: bool = True) ->
     
     Args:
         request: Morph request with start/end parameters
-        generate_meshes: If True, generate GLB files for each step
+        generate_meshes: If True, generate one GLB with a morph target and
+            per-step weights; otherwise write the parameter sequence
         
     Returns:
-        Morph response with paths to generated files
+        Morph response with paths to generated files (and weights for the GLB)
     """
     sequence = interpolate_parameters(request.start_parameters, request.end_parameters, request.steps)
     morph_dir = Path("output/morphs")
     morph_dir.mkdir(parents=True, exist_ok=True)
+    # Requests run concurrently in worker threads, so each writes its own files
+    morph_id = token_hex(16)
     paths: List[str] = []
+    weights = None
     
     if generate_meshes:
-        # Generate meshes for start and end states
-        _, start_glb, _ = generate_avatar_assets(request.start_parameters)
-        _, end_glb, _ = generate_avatar_assets(request.end_parameters)
-        
-        # Load meshes
-        start_mesh = trimesh.load(Path(start_glb))
-        end_mesh = trimesh.load(Path(end_glb))
-        
-        # Interpolate meshes
-        morph_meshes = interpolate_meshes(start_mesh, end_mesh, request.steps)
-        
-        # Save interpolated meshes
-        for idx, mesh in enumerate(morph_meshes):
-            glb_path = morph_dir / f"morph_{idx:03d}.glb"
-            scene = trimesh.Scene(mesh)
-            scene.export(glb_path, file_type="glb")
-            paths.append(str(glb_path))
+        # Build start and end meshes in memory with one batched SMPL-X pass
+        start_mesh, end_mesh = _generate_avatar_meshes(
+            [request.start_parameters, request.end_parameters]
+        )
+
+        if start_mesh.vertices.shape != end_mesh.vertices.shape:
+            raise ValueError("Meshes must have the same vertex count for interpolation")
+
+        # Every interpolated step is start + t * (end - start), so one morph
+        # target plus a weight per step replaces a GLB per step. With the
+        # default T-pose SMPL-X vertices are linear in betas, so this matches
+        # a forward pass per step.
+        delta = end_mesh.vertices - start_mesh.vertices
+        glb_path = morph_dir / f"{morph_id}.glb"
+        _export_glb(start_mesh, glb_path, morph_targets=[delta])
+        paths.append(str(glb_path))
+        weights = np.linspace(0.0, 1.0, request.steps).tolist()
     else:
-        # Just save parameter files (legacy behavior)
-        for idx, params in enumerate(sequence):
-            path = morph_dir / f"morph_{idx:03d}.json"
-            path.write_text(params.json(indent=2))
-            paths.append(str(path))
+        # Just save the parameter sequence (legacy behavior), one JSON object per line
+        path = morph_dir / f"{morph_id}.jsonl"
+        options = orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+        path.write_bytes(b"".join(orjson.dumps(params.__dict__, option=options) for params in sequence))
+        paths.append(str(path))
     
-    return MorphResponse(morph_sequence_paths=paths)
+    return MorphResponse(morph_sequence_paths=paths, morph_weights=weights)
 
 
@@ -4,6 +4,8 @@ Body (and optional face) personalization utilities.
 from __future__ import annotations
 
 import contextlib
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Optional
 
@@ -12,27 +14,38 @@ import numpy as np
 
 from .models import DexaScanData
 
-try:
-    import mediapipe as mp
+# Pose landmark index pairs for each measurement (11/12 shoulders, 23/24 hips)
+_MEASUREMENT_NAMES = ("shoulder_width", "hip_width", "torso_length")
+_MEASUREMENT_PAIRS = np.array([[11, 12], [23, 24], [11, 23]])
 
-    _POSE = mp.solutions.pose.Pose(static_image_mode=True)
-    _FACE_MESH = mp.solutions.face_mesh.FaceMesh(static_image_mode=True)
-except Exception:  # pragma: no cover - mediapipe may be unavailable in CI
-    _POSE = None
-    _FACE_MESH = None
+# The shared Pose graph is called from request worker threads; it isn't thread-safe
+_POSE_LOCK = threading.Lock()
+
+
+# The MediaPipe graph is built on first use, once per process, so requests
+# without a photo never pay for importing mediapipe or loading its model.
+@lru_cache(maxsize=1)
+def _get_pose():
+    try:
+        import mediapipe as mp
+
+        # Complexity 0 is the lite model; only a few coarse landmarks are used
+        return mp.solutions.pose.Pose(
+            static_image_mode=True, model_complexity=0, enable_segmentation=False
+        )
+    except Exception:  # pragma: no cover - mediapipe may be unavailable in CI
+        return None
 
 
 def _load_image(image_path: Path) -> np.ndarray:
-    image = cv2.imread(str(image_path))
+    # Decode at half resolution: Pose downsamples internally anyway and the
+    # measurements are in normalized coordinates, so they are unaffected
+    image = cv2.imread(str(image_path), cv2.IMREAD_REDUCED_COLOR_2)
     if image is None:
         raise FileNotFoundError(f"Failed to load image: {image_path}")
     return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
 
-def _compute_distance(a, b) -> float:
-    return float(np.linalg.norm(np.array(a) - np.array(b)))
-
-
 def extract_body_measurements(image_path: Path) -> Dict[str, float]:
     """
     Use MediaPipe Pose (if available) to derive body width / limb ratios.
@@ -40,28 +53,28 @@ def extract_body_measurements(image_path: Path) -> Dict[str, float]:
     can continue without personalization.
     """
 
-    if _POSE is None:
+    pose = _get_pose()
+    if pose is None:
         return {}
 
     image = _load_image(image_path)
-    results = _POSE.process(image)
+    with _POSE_LOCK:
+        results = pose.process(image)
     if not results.pose_landmarks:
         return {}
 
     landmarks = results.pose_landmarks.landmark
-    def _pt(index: int) -> np.ndarray:
-        lm = landmarks[index]
-        return np.array([lm.x, lm.y])
-
-    shoulders = _compute_distance(_pt(11), _pt(12))
-    hips = _compute_distance(_pt(23), _pt(24))
-    chest = _compute_distance(_pt(11), _pt(23))
-
-    return {
-        "shoulder_width": shoulders,
-        "hip_width": hips,
-        "torso_length": chest,
-    }
+    points = np.fromiter(
+        (coord for lm in landmarks for coord in (lm.x, lm.y)),
+        dtype=np.float64,
+        count=len(landmarks) * 2,
+    ).reshape(-1, 2)
+
+    # All three 2-D distances in one pass
+    deltas = points[_MEASUREMENT_PAIRS[:, 0]] - points[_MEASUREMENT_PAIRS[:, 1]]
+    distances = np.hypot(deltas[:, 0], deltas[:, 1])
+
+    return dict(zip(_MEASUREMENT_NAMES, distances.tolist()))
 
 
 def derive_scale_adjustments(
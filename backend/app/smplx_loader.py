@@ -16,12 +16,15 @@ from __future__ import annotations
 
 import os
 import pickle
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Union
 
 import numpy as np
 import trimesh
 
+from ._kernels import blend_shape
+
 # Try to import SMPL-X library (smplx package)
 try:
     import smplx
@@ -42,6 +45,64 @@ SMPLX_MODEL_DIR = Path(os.getenv("SMPLX_MODEL_DIR", "models"))
 SMPLX_MODEL_PATH = SMPLX_MODEL_DIR / "SMPLX_NEUTRAL.pkl"
 
 
+# smplx model inputs whose batch-1 defaults must be overridden for batched forwards
+_LIBRARY_DEFAULT_INPUTS = (
+    "jaw_pose",
+    "leye_pose",
+    "reye_pose",
+    "left_hand_pose",
+    "right_hand_pose",
+    "expression",
+)
+
+# Arrays the pickle fallback actually uses, cast to the dtypes _apply_shape_blend wants
+_NPZ_DTYPES = {"v_template": np.float32, "shapedirs": np.float32, "f": np.int64}
+
+# The official SMPL-X download ships its own SMPLX_<GENDER>.npz model files, so
+# the cache gets a distinct name and a marker member identifying it as ours
+_CACHE_SUFFIX = ".blend-cache.npz"
+_CACHE_MARKER = "blend_cache_version"
+
+
+def _blend_cache_path(pkl_path: Path) -> Path:
+    """Sibling cache file for a model pickle, e.g. SMPLX_NEUTRAL.blend-cache.npz."""
+    return pkl_path.with_name(pkl_path.stem + _CACHE_SUFFIX)
+
+
+def _convert_pickle_to_npz(pkl_path: Path, write_cache: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Read an SMPL-X pickle once and cache the arrays we use in a sibling .npz.
+
+    Args:
+        pkl_path: Model pickle to read
+        write_cache: False when a file the loader did not write sits at the cache path
+
+    Returns:
+        The extracted arrays, so the caller doesn't have to read them back.
+    """
+    with open(pkl_path, "rb") as f:
+        raw = pickle.load(f, encoding="latin1")
+
+    model_data = {
+        key: np.asarray(raw[key], dtype=dtype)
+        for key, dtype in _NPZ_DTYPES.items()
+        if key in raw
+    }
+    if not write_cache:
+        return model_data
+
+    npz_path = _blend_cache_path(pkl_path)
+    tmp_path = npz_path.with_name(npz_path.name + ".part")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **model_data, **{_CACHE_MARKER: np.array(1)})
+        os.replace(tmp_path, npz_path)
+    except OSError as e:
+        # Read-only model directories just miss out on the cache
+        print(f"Could not cache SMPL-X model as {npz_path}: {e}")
+    return model_data
+
+
 class SMPLXModel:
     """Wrapper for SMPL-X model loading and mesh generation."""
 
@@ -59,9 +120,24 @@ class SMPLXModel:
         self.smplx_model = None
         self.loaded = False
         self.use_library = SMPLX_LIBRARY_AVAILABLE and TORCH_AVAILABLE
+        # Model file found by _find_model_file, so later calls skip the stat() probes
+        self._resolved_path: Optional[Path] = None
+        # Float32 blend arrays derived from model_data when it is loaded
+        self._v_template_f32: Optional[np.ndarray] = None
+        self._shapedirs_2d: Optional[np.ndarray] = None
+        # Contiguous copies of the leading shapedirs columns, keyed by beta count
+        self._shapedirs_columns: Dict[int, np.ndarray] = {}
+        # Per-thread (V, 3) scratch buffer for _generate_from_pickle
+        self._blend_buffers = threading.local()
+        # Default (T-pose) tensors, allocated on first library forward pass
+        self._zero_body_pose = None
+        self._zero_global_orient = None
 
     def _find_model_file(self) -> Optional[Path]:
         """Find the appropriate SMPL-X model file."""
+        if self._resolved_path is not None:
+            return self._resolved_path
+
         # Try different model file names
         model_names = [
             f"SMPLX_{self.gender.upper()}.pkl",
@@ -72,18 +148,20 @@ class SMPLXModel:
         for name in model_names:
             model_file = self.model_path / name
             if model_file.exists():
+                self._resolved_path = model_file
                 return model_file
         
         # Also check if model_path is a file directly
         if self.model_path.is_file():
+            self._resolved_path = self.model_path
             return self.model_path
         
+        # Not cached: the model files may be installed while the server runs
         return None
 
     def is_available(self) -> bool:
         """Check if SMPL-X model files are available."""
-        model_file = self._find_model_file()
-        return model_file is not None and model_file.exists()
+        return self._find_model_file() is not None
 
     def load_model(self) -> bool:
         """
@@ -92,9 +170,6 @@ class SMPLXModel:
         Returns:
             True if model loaded successfully, False otherwise.
         """
-        if not self.is_available():
-            return False
-
         model_file = self._find_model_file()
         if not model_file:
             return False
@@ -125,6 +200,7 @@ class SMPLXModel:
                 num_betas=10,  # Use 10 shape parameters
                 ext='pkl',
             )
+            self.smplx_model.eval()
             self.loaded = True
             return True
         except Exception as e:
@@ -135,8 +211,29 @@ class SMPLXModel:
     def _load_from_pickle(self, model_file: Path) -> bool:
         """Load model from pickle file (fallback method)."""
         try:
-            with open(model_file, "rb") as f:
-                self.model_data = pickle.load(f, encoding="latin1")
+            npz_path = _blend_cache_path(model_file)
+            cached = None
+            write_cache = True
+            if npz_path.exists():
+                # Uncompressed archive: each member is a straight buffer read
+                with np.load(npz_path) as data:
+                    model_data = {key: data[key] for key in data.files}
+                if model_data.pop(_CACHE_MARKER, None) is None:
+                    # Not written by this loader; never overwrite it
+                    write_cache = False
+                # Caches written with other dtypes (e.g. float16 shapedirs) are rebuilt
+                elif all(
+                    model_data[key].dtype == dtype
+                    for key, dtype in _NPZ_DTYPES.items()
+                    if key in model_data
+                ):
+                    cached = model_data
+            if cached is None:
+                cached = _convert_pickle_to_npz(model_file, write_cache)
+            self.model_data = cached
+            # Prepared here, before any request thread can see the model as loaded
+            if "v_template" in self.model_data:
+                self._prepare_shape_blend()
             self.loaded = True
             return True
         except Exception as e:
@@ -179,6 +276,74 @@ class SMPLXModel:
             print(f"Error generating SMPL-X mesh: {e}")
             return None
 
+    def generate_meshes_batched(
+        self,
+        betas_batch: np.ndarray,
+        scale: Union[float, Sequence[float]] = 1.0,
+    ) -> Optional[List[trimesh.Trimesh]]:
+        """
+        Generate T-posed meshes for several shape vectors in one forward pass.
+
+        Args:
+            betas_batch: Shape parameters, one row per mesh (N x num_betas)
+            scale: Overall scale factor, shared or one per row
+
+        Returns:
+            List of N Trimesh objects or None if generation fails.
+        """
+        if not self.loaded:
+            if not self.load_model():
+                return None
+
+        betas_batch = np.atleast_2d(np.asarray(betas_batch, dtype=np.float32))
+        scales = np.broadcast_to(np.asarray(scale, dtype=np.float32), (len(betas_batch),))
+
+        try:
+            if self.smplx_model is not None:
+                vertices_batch = self._vertices_with_library(betas_batch)
+                faces = self.smplx_model.faces
+            elif self.model_data is not None and "v_template" in self.model_data:
+                vertices_batch = self._apply_shape_blend_batched(betas_batch)
+                faces = self.model_data.get("f", None)
+            else:
+                return None
+
+            if vertices_batch is None or faces is None:
+                return None
+
+            # Scale each mesh about the origin, as apply_scale does
+            vertices_batch = vertices_batch * scales[:, None, None]
+            return [
+                trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+                for vertices in vertices_batch
+            ]
+        except Exception as e:
+            print(f"Error generating batched SMPL-X meshes: {e}")
+            return None
+
+    def _vertices_with_library(self, betas_batch: np.ndarray) -> Optional[np.ndarray]:
+        """Run one smplx forward pass over a (N, num_betas) batch in T-pose."""
+        batch_size = len(betas_batch)
+
+        def zeros(width: int):
+            return torch.zeros((batch_size, width), dtype=torch.float32)
+
+        # The model is created with batch_size=1, and forward() concatenates its
+        # own batch-1 face/hand/expression defaults with the inputs, so every
+        # one of them is passed explicitly at batch N
+        defaults = {
+            name: zeros(getattr(self.smplx_model, name).shape[-1])
+            for name in _LIBRARY_DEFAULT_INPUTS
+        }
+        with torch.inference_mode():
+            output = self.smplx_model(
+                betas=torch.from_numpy(betas_batch),
+                body_pose=zeros(63),
+                global_orient=zeros(3),
+                **defaults,
+            )
+        return output.vertices.detach().cpu().numpy()
+
     def _generate_with_library(
         self,
         betas: np.ndarray,
@@ -193,22 +358,29 @@ class SMPLXModel:
             
             # Default pose (T-pose) if not provided
             if pose is None:
-                body_pose = torch.zeros((1, 63), dtype=torch.float32)
+                if self._zero_body_pose is None:
+                    self._zero_body_pose = torch.zeros((1, 63), dtype=torch.float32)
+                body_pose = self._zero_body_pose
             else:
                 body_pose = torch.from_numpy(pose.astype(np.float32)).unsqueeze(0)
             
             # Default global orientation if not provided
             if global_orient is None:
-                global_orient_tensor = torch.zeros((1, 3), dtype=torch.float32)
+                if self._zero_global_orient is None:
+                    self._zero_global_orient = torch.zeros((1, 3), dtype=torch.float32)
+                global_orient_tensor = self._zero_global_orient
             else:
-                global_orient_tensor = torch.from_numpy(global_orient.astype(np.float32)).unsqueeze(0)
+                global_orient_tensor = torch.from_numpy(
+                    global_orient.astype(np.float32)
+                ).unsqueeze(0)
             
-            # Generate mesh
-            output = self.smplx_model(
-                betas=betas_tensor,
-                body_pose=body_pose,
-                global_orient=global_orient_tensor,
-            )
+            # Generate mesh; no gradients are ever needed here
+            with torch.inference_mode():
+                output = self.smplx_model(
+                    betas=betas_tensor,
+                    body_pose=body_pose,
+                    global_orient=global_orient_tensor,
+                )
             
             # Extract vertices and faces
             vertices = output.vertices[0].detach().cpu().numpy()
@@ -229,8 +401,9 @@ class SMPLXModel:
             if "v_template" not in self.model_data:
                 return None
 
-            # Apply shape blend shapes
-            vertices = self._apply_shape_blend(betas)
+            # Apply shape blend shapes into this thread's reusable buffer;
+            # Trimesh copies it (to float64) so the next call can overwrite it
+            vertices = self._apply_shape_blend(betas, out=self._blend_buffer())
             faces = self.model_data.get("f", None)
 
             if faces is None:
@@ -243,39 +416,90 @@ class SMPLXModel:
             print(f"Error generating mesh from pickle: {e}")
             return None
 
-    def _apply_shape_blend(self, betas: np.ndarray) -> np.ndarray:
+    def _apply_shape_blend(self, betas: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Apply shape blend shapes to template vertices.
 
         This implements the SMPL-X shape blending formula:
         v_shaped = v_template + sum(betas[i] * shapedirs[i])
+
+        If given, ``out`` is a contiguous float32 (num_vertices, 3) array the
+        result is written to instead of a new allocation.
         """
         if not self.model_data or "v_template" not in self.model_data:
             raise ValueError("Model data not loaded or invalid")
 
-        v_template = self.model_data["v_template"]
-        shapedirs = self.model_data.get("shapedirs", None)
+        v_template = self._v_template_f32
+
+        if out is None:
+            out = np.empty(v_template.shape, dtype=np.float32)
 
-        if shapedirs is None:
+        if self._shapedirs_2d is None:
             # No shape blend shapes, return template
-            return v_template.copy()
-
-        # Ensure betas is the right size
-        if len(betas) > shapedirs.shape[-1]:
-            betas = betas[:shapedirs.shape[-1]]
-        elif len(betas) < shapedirs.shape[-1]:
-            # Pad with zeros
-            betas_padded = np.zeros(shapedirs.shape[-1])
-            betas_padded[:len(betas)] = betas
-            betas = betas_padded
-
-        # Apply shape blend shapes
-        # shapedirs shape: (num_vertices, 3, num_betas)
-        # betas shape: (num_betas,)
+            np.copyto(out, v_template)
+            return out
+
+        # Betas past the number of blend shapes are ignored; missing ones are
+        # zero, so only the columns for the betas given need to be read
+        count = min(len(betas), self._shapedirs_2d.shape[-1])
+        betas_f32 = np.ascontiguousarray(betas[:count], dtype=np.float32)
+
+        # Apply shape blend shapes in one fused pass over shapedirs
+        # shapedirs columns shape: (num_vertices * 3, count)
         # Result: (num_vertices, 3)
-        v_shaped = v_template + np.einsum('vij,j->vi', shapedirs, betas)
+        shapedirs = self._leading_shapedirs(count)
+        blend_shape(v_template.reshape(-1), shapedirs, betas_f32, out.reshape(-1))
+
+        return out
 
-        return v_shaped
+    def _blend_buffer(self) -> np.ndarray:
+        """Return the calling thread's scratch buffer for blended vertices."""
+        buffer = getattr(self._blend_buffers, "vertices", None)
+        if buffer is None:
+            buffer = np.empty(self._v_template_f32.shape, dtype=np.float32)
+            self._blend_buffers.vertices = buffer
+        return buffer
+
+    def _apply_shape_blend_batched(self, betas_batch: np.ndarray) -> np.ndarray:
+        """Apply shape blend shapes for N beta vectors at once: (N, num_vertices, 3)."""
+        if not self.model_data or "v_template" not in self.model_data:
+            raise ValueError("Model data not loaded or invalid")
+
+        v_template = self._v_template_f32
+
+        if self._shapedirs_2d is None:
+            return np.repeat(v_template[None], len(betas_batch), axis=0)
+
+        count = min(betas_batch.shape[-1], self._shapedirs_2d.shape[-1])
+        betas_f32 = np.asarray(betas_batch[:, :count], dtype=np.float32)
+
+        # One GEMM for the whole batch: (V*3, count) @ (count, N) -> (V*3, N)
+        offsets = (self._leading_shapedirs(count) @ betas_f32.T).T
+        return v_template + offsets.reshape((-1,) + v_template.shape)
+
+    def _leading_shapedirs(self, count: int) -> np.ndarray:
+        """Return the first ``count`` shapedirs columns as a contiguous array."""
+        if count == self._shapedirs_2d.shape[-1]:
+            return self._shapedirs_2d
+        columns = self._shapedirs_columns.get(count)
+        if columns is None:
+            # e.g. 10 DEXA betas against SMPL-X's 400 shape + expression columns
+            columns = np.ascontiguousarray(self._shapedirs_2d[:, :count])
+            self._shapedirs_columns[count] = columns
+        return columns
+
+    def _prepare_shape_blend(self) -> None:
+        """Cache float32 template vertices and blend shapes flattened for matmul."""
+        shapedirs = self.model_data.get("shapedirs", None)
+        if shapedirs is not None:
+            # (num_vertices, 3, num_betas) -> (num_vertices * 3, num_betas)
+            shapedirs = np.asarray(shapedirs)
+            shapedirs = np.ascontiguousarray(
+                shapedirs.reshape(-1, shapedirs.shape[-1]), dtype=np.float32
+            )
+        self._shapedirs_columns = {}
+        self._shapedirs_2d = shapedirs
+        self._v_template_f32 = np.asarray(self.model_data["v_template"], dtype=np.float32)
 
 
 # Global model instance (lazy loading)
@@ -316,3 +540,31 @@ def generate_smplx_mesh(
         return model.generate_mesh(betas, scale=scale)
 
     return None
+
+
+def generate_smplx_meshes(
+    betas_batch: np.ndarray,
+    scales: Union[float, Sequence[float]] = 1.0,
+    use_smplx: bool = True,
+    gender: str = "neutral",
+) -> Optional[List[trimesh.Trimesh]]:
+    """
+    Generate several meshes in one batched SMPL-X pass if available.
+
+    Args:
+        betas_batch: Shape parameters, one row per mesh (N x 10)
+        scales: Overall scale, shared or one per row
+        use_smplx: Whether to attempt SMPL-X generation
+        gender: Model gender ('neutral', 'male', or 'female')
+
+    Returns:
+        List of N Trimesh objects if SMPL-X available and successful, None otherwise.
+    """
+    if not use_smplx:
+        return None
+
+    model = get_smplx_model(gender=gender)
+    if model and model.is_available():
+        return model.generate_meshes_batched(betas_batch, scale=scales)
+
+    return None
@@ -1,10 +1,17 @@
 """
 Unit tests for avatar generator.
 """
+import io
+import json
+import struct
+
 import pytest
 import numpy as np
+import trimesh
 from backend.app.avatar_generator import (
     map_metrics_to_parameters,
+    _create_placeholder_mesh,
+    _glb_bytes,
     _normalize,
 )
 from backend.app.models import DexaScanData, DexaBodyMetrics
@@ -88,3 +95,57 @@ def test_parameter_clamping():
     for beta in params.betas:
         assert -2.5 <= beta <= 2.5  # Allow small margin
 
+
+
+def test_glb_bytes_round_trip():
+    """Test that the hand-written GLB loads back as the same mesh."""
+    mesh = _create_placeholder_mesh(1.1)
+
+    data = _glb_bytes(mesh)
+    loaded = trimesh.load(io.BytesIO(data), file_type="glb", force="mesh")
+
+    assert data[:4] == b"glTF"
+    assert len(data) % 4 == 0
+    assert np.allclose(loaded.vertices, mesh.vertices, atol=1e-6)
+    assert np.array_equal(loaded.faces, mesh.faces)
+
+
+def test_glb_bytes_morph_targets():
+    """Test morph-target deltas are stored after the base positions."""
+    mesh = _create_placeholder_mesh(1.0)
+    delta = mesh.vertices * 0.5
+
+    data = _glb_bytes(mesh, morph_targets=[delta])
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    gltf = json.loads(data[20 : 20 + json_length])
+    binary = data[20 + json_length + 8 :]
+
+    primitive = gltf["meshes"][0]["primitives"][0]
+    assert primitive["targets"] == [{"POSITION": 2}]
+    assert gltf["meshes"][0]["weights"] == [0.0]
+    view = gltf["bufferViews"][gltf["accessors"][2]["bufferView"]]
+    stored = np.frombuffer(binary, dtype="<f4", count=delta.size, offset=view["byteOffset"])
+    assert np.allclose(stored.reshape(-1, 3), delta, atol=1e-6)
+    assert len(data) == struct.unpack_from("<I", data, 8)[0]
+
+
+def test_glb_bytes_quantized_positions():
+    """Test quantized positions dequantize through the node transform."""
+    mesh = _create_placeholder_mesh(1.3)
+
+    data = _glb_bytes(mesh, quantize=True)
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    gltf = json.loads(data[20 : 20 + json_length])
+    binary = data[20 + json_length + 8 :]
+
+    assert gltf["extensionsRequired"] == ["KHR_mesh_quantization"]
+    node = gltf["nodes"][0]
+    view = gltf["bufferViews"][gltf["accessors"][1]["bufferView"]]
+    quantized = np.frombuffer(
+        binary, dtype="<u2", count=len(mesh.vertices) * 4, offset=view["byteOffset"]
+    ).reshape(-1, 4)[:, :3]
+    positions = np.array(node["translation"]) + np.array(node["scale"]) * quantized / 65535.0
+
+    # 16 bits over the bounding box: well under a tenth of a millimetre per metre
+    assert np.abs(positions - mesh.vertices).max() < 1e-4 * np.ptp(mesh.vertices)
+    assert len(data) < len(_glb_bytes(mesh))
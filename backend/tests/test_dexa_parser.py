@@ -3,7 +3,14 @@ Unit tests for DEXA PDF parser.
 """
 import pytest
 from pathlib import Path
-from backend.app.dexa_parser import parse_pdf_bytes, DexaParserError
+from backend.app.dexa_parser import (
+    parse_pdf_bytes,
+    DexaParserError,
+    _extract_body_metrics,
+    _extract_metadata,
+    _extract_region_metrics,
+    _parse_scan_date,
+)
 
 
 def test_parse_valid_pdf():
@@ -43,3 +50,87 @@ def test_parse_empty_pdf():
     with pytest.raises(DexaParserError):
         parse_pdf_bytes(empty_pdf)
 
+
+
+def test_extract_body_metrics_single_scan():
+    """Test that the fused metric pattern picks up every metric once."""
+    text = (
+        "Total body weight (kg) 76.1\n"
+        "Height (cm): 177\n"
+        "Total Body Fat % 22.9\n"
+        "Lean Mass (kg) - 55.6\n"
+        "Android fat % 28.8\n"
+        "Total body fat % 99.0\n"
+    )
+
+    metrics = _extract_body_metrics(text)
+
+    assert metrics["weight_kg"] == 76.1
+    assert metrics["height_cm"] == 177.0
+    assert metrics["total_fat_percent"] == 22.9
+    assert metrics["total_lean_mass_kg"] == 55.6
+    assert metrics["android_fat_percent"] == 28.8
+    assert metrics["gynoid_fat_percent"] is None
+    assert metrics["total_bone_mass_kg"] is None
+
+
+def test_extract_region_metrics():
+    """Test region rows split into fat %, lean and bone mass columns."""
+    text = (
+        "Region  %Fat  Lean (kg)  BMC (kg)\n"
+        "Arms  25.3  6.1  0.4\n"
+        "Legs\t30.1\t18.2\n"
+        "Trunk:  28\n"
+        "Android\n"
+        "Android/Gynoid ratio  1.16\n"
+    )
+
+    regions = _extract_region_metrics(text)
+
+    assert set(regions) == {"arms", "legs", "trunk"}
+    assert regions["arms"].fat_percent == 25.3
+    assert regions["arms"].lean_mass_kg == 6.1
+    assert regions["arms"].bone_mass_kg == 0.4
+    assert regions["legs"].lean_mass_kg == 18.2
+    assert regions["legs"].bone_mass_kg is None
+    assert regions["trunk"].fat_percent == 28.0
+
+
+def test_extract_metadata():
+    """Test patient, date and device fields come from a single scan."""
+    text = (
+        "Device: Lunar iDXA\n"
+        "Patient ID: ab-123\n"
+        "Scan Date: 14/10/2025 11:52\n"
+        "Report date: 01/02/2024\n"
+    )
+
+    metadata = _extract_metadata(text)
+
+    assert metadata == {
+        "patient_id": "ab-123",
+        "scan_date": "14/10/2025",
+        "device_model": "Lunar iDXA",
+    }
+
+
+def test_extract_metadata_fields_on_one_line():
+    """Test a device field doesn't swallow labels that follow it on the same line."""
+    assert _extract_metadata("Device: GE Lunar Scan Date: 01/02/2024") == {
+        "patient_id": None,
+        "scan_date": "01/02/2024",
+        "device_model": "GE Lunar",
+    }
+    assert _extract_metadata("Model: iDXA Patient ID: 42") == {
+        "patient_id": "42",
+        "scan_date": None,
+        "device_model": "iDXA",
+    }
+
+
+def test_parse_scan_date_formats():
+    """Test US-first dates with day-first and two-digit-year fallbacks."""
+    assert _parse_scan_date("10/11/2025") == "2025-10-11"
+    assert _parse_scan_date("14/10/2025") == "2025-10-14"
+    assert _parse_scan_date("1/2/25") == "2025-01-02"
+    assert _parse_scan_date("13/13/2025") is None
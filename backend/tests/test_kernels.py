@@ -0,0 +1,21 @@
+"""
+Unit tests for the per-vertex blend kernel.
+"""
+import numpy as np
+import pytest
+from backend.app import _kernels
+
+
+@pytest.mark.parametrize("blend_shape", [_kernels.blend_shape, _kernels._blend_shape_numpy])
+def test_blend_shape(blend_shape):
+    """Test the fused blend matches v_template + shapedirs @ betas."""
+    rng = np.random.default_rng(0)
+    v_template = rng.normal(size=30).astype(np.float32)
+    shapedirs_2d = rng.normal(size=(30, 4)).astype(np.float32)
+    betas = rng.normal(size=4).astype(np.float32)
+    out = np.empty(30, dtype=np.float32)
+
+    blend_shape(v_template, shapedirs_2d, betas, out)
+
+    assert np.allclose(out, v_template + shapedirs_2d @ betas, atol=1e-5)
+
@@ -0,0 +1,96 @@
+"""
+Unit tests for the avatar API endpoints.
+"""
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import avatar_generator, main
+from backend.app.models import DexaBodyMetrics, DexaScanData
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Client writing to a temporary output directory, with the PDF parser stubbed."""
+    monkeypatch.chdir(tmp_path)
+    output_dir = Path("output")
+    output_dir.mkdir()
+    monkeypatch.setattr(main, "OUTPUT_DIR", output_dir)
+    monkeypatch.setattr(avatar_generator, "OUTPUT_DIR", output_dir)
+    monkeypatch.setattr(main, "_AVATAR_CACHE", OrderedDict())
+
+    parsed = []
+
+    def parse_pdf_bytes(pdf_bytes):
+        parsed.append(pdf_bytes)
+        return DexaScanData(
+            body_metrics=DexaBodyMetrics(
+                total_fat_percent=25.0, total_lean_mass_kg=60.0, height_cm=170.0, weight_kg=80.0
+            ),
+            regions={},
+        )
+
+    monkeypatch.setattr(main, "parse_pdf_bytes", parse_pdf_bytes)
+    test_client = TestClient(main.app)
+    test_client.parsed = parsed
+    return test_client
+
+
+def _upload(client, pdf_bytes=b"%PDF-1.4 report"):
+    return client.post(
+        "/api/generate-avatar",
+        files={"dexa_file": ("scan.pdf", pdf_bytes, "application/pdf")},
+    )
+
+
+def test_pending_avatar_becomes_ready(client, monkeypatch):
+    """Test the GLB is 404 while the export is pending and served once it finishes."""
+    exports = []
+    monkeypatch.setattr(main, "export_avatar_assets", lambda *args: exports.append(args))
+
+    response = _upload(client)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    avatar_id = response.json()["avatar_id"]
+    assert client.head(f"/api/avatar/{avatar_id}/glb").status_code == 404
+    assert client.get(f"/api/avatar/{avatar_id}/glb").status_code == 404
+
+    # Finish the export the background task was handed
+    [(exported_id, parameters)] = exports
+    avatar_generator.export_avatar_assets(exported_id, parameters)
+
+    assert client.head(f"/api/avatar/{avatar_id}/glb").status_code == 200
+    glb = client.get(f"/api/avatar/{avatar_id}/glb")
+    assert glb.status_code == 200
+    assert glb.content[:4] == b"glTF"
+
+
+def test_failed_export_returns_500(client, monkeypatch):
+    """Test a background export that raises is reported instead of a 404 forever."""
+
+    def export_avatar_assets(avatar_id, parameters):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(main, "export_avatar_assets", export_avatar_assets)
+
+    avatar_id = _upload(client).json()["avatar_id"]
+
+    assert client.head(f"/api/avatar/{avatar_id}/glb").status_code == 500
+    response = client.get(f"/api/avatar/{avatar_id}/glb")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Avatar export failed: disk full"
+
+
+def test_repeated_upload_is_served_from_cache(client):
+    """Test an identical upload reuses the exported avatar without re-parsing."""
+    first = _upload(client).json()
+    second = _upload(client).json()
+
+    assert first["status"] == "pending"
+    assert second["status"] == "ready"
+    assert second["avatar_id"] == first["avatar_id"]
+    assert len(client.parsed) == 1
+    assert _upload(client, b"%PDF-1.4 other report").json()["avatar_id"] != first["avatar_id"]
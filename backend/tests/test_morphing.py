@@ -0,0 +1,82 @@
+"""
+Unit tests for morphing utilities.
+"""
+import pytest
+import numpy as np
+from trimesh.creation import icosphere
+from backend.app.morphing import handle_morph_request, interpolate_meshes, interpolate_parameters
+from backend.app.models import AvatarParameters, MorphRequest
+
+
+def test_interpolate_parameters_endpoints():
+    """Test that the sequence starts and ends at the given states."""
+    start = AvatarParameters(betas=[0.0, 1.0], scales={"overall": 1.0})
+    end = AvatarParameters(betas=[1.0, -1.0], scales={"overall": 1.2, "waist": 0.8})
+
+    sequence = interpolate_parameters(start, end, 5)
+
+    assert len(sequence) == 5
+    assert sequence[0].betas == pytest.approx([0.0, 1.0])
+    assert sequence[-1].betas == pytest.approx([1.0, -1.0])
+    assert sequence[2].betas == pytest.approx([0.5, 0.0])
+    # Keys missing on one side interpolate from/to 1.0
+    assert sequence[0].scales["waist"] == pytest.approx(1.0)
+    assert sequence[-1].scales["waist"] == pytest.approx(0.8)
+    assert sequence[2].scales["overall"] == pytest.approx(1.1)
+
+
+def test_interpolate_parameters_shape_mismatch():
+    """Test that mismatched beta vectors are rejected."""
+    start = AvatarParameters(betas=[0.0, 1.0])
+    end = AvatarParameters(betas=[0.0, 1.0, 2.0])
+
+    with pytest.raises(ValueError):
+        interpolate_parameters(start, end, 3)
+
+
+def test_interpolate_meshes_blends_vertices():
+    """Test vertex-level interpolation between two meshes of equal topology."""
+    start = icosphere(subdivisions=1, radius=1.0)
+    end = icosphere(subdivisions=1, radius=2.0)
+
+    meshes = interpolate_meshes(start, end, 3)
+
+    assert len(meshes) == 3
+    assert np.allclose(meshes[0].vertices, start.vertices)
+    assert np.allclose(meshes[1].vertices, start.vertices * 1.5)
+    assert np.allclose(meshes[2].vertices, end.vertices)
+    assert all(np.array_equal(mesh.faces, start.faces) for mesh in meshes)
+
+
+def test_handle_morph_request_writes_morph_target_glb(tmp_path, monkeypatch):
+    """Test a mesh morph request writes one GLB plus a weight per step."""
+    monkeypatch.chdir(tmp_path)
+    request = MorphRequest(
+        start_parameters=AvatarParameters(betas=[0.0] * 10, scales={"overall": 1.0}),
+        end_parameters=AvatarParameters(betas=[1.0] * 10, scales={"overall": 1.2}),
+        steps=4,
+    )
+
+    response = handle_morph_request(request)
+
+    [glb_path] = response.morph_sequence_paths
+    assert glb_path.startswith("output/morphs/") and glb_path.endswith(".glb")
+    assert (tmp_path / glb_path).read_bytes()[:4] == b"glTF"
+    assert response.morph_weights == pytest.approx([0.0, 1 / 3, 2 / 3, 1.0])
+
+
+def test_handle_morph_request_paths_are_per_request(tmp_path, monkeypatch):
+    """Test concurrent-safe output: each request gets its own files."""
+    monkeypatch.chdir(tmp_path)
+    request = MorphRequest(
+        start_parameters=AvatarParameters(betas=[0.0] * 10, scales={"overall": 1.0}),
+        end_parameters=AvatarParameters(betas=[1.0] * 10, scales={"overall": 1.2}),
+        steps=3,
+    )
+
+    first = handle_morph_request(request, generate_meshes=False)
+    second = handle_morph_request(request, generate_meshes=False)
+
+    assert first.morph_sequence_paths != second.morph_sequence_paths
+    for path in first.morph_sequence_paths + second.morph_sequence_paths:
+        assert len((tmp_path / path).read_bytes().splitlines()) == 3
@@ -0,0 +1,198 @@
+"""
+Unit tests for SMPL-X model loading and shape blending.
+"""
+import pickle
+
+import numpy as np
+import pytest
+from backend.app.smplx_loader import SMPLXModel
+
+
+def _write_model(path, num_vertices=12, num_betas=4):
+    rng = np.random.default_rng(0)
+    model_data = {
+        "v_template": rng.normal(size=(num_vertices, 3)),
+        # Real blend shapes are offsets of a few millimetres per unit beta
+        "shapedirs": rng.normal(scale=0.005, size=(num_vertices, 3, num_betas)),
+        "f": np.arange(num_vertices).reshape(-1, 3),
+    }
+    with open(path, "wb") as f:
+        pickle.dump(model_data, f)
+    return model_data
+
+
+def test_apply_shape_blend_matches_reference(tmp_path):
+    """Test blended vertices equal v_template + shapedirs . betas."""
+    model_data = _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+    assert model.load_model()
+
+    betas = np.array([0.5, -1.0, 2.0, 0.25])
+    expected = model_data["v_template"] + np.einsum("vij,j->vi", model_data["shapedirs"], betas)
+
+    assert np.allclose(model._apply_shape_blend(betas), expected, atol=1e-4)
+
+
+def test_apply_shape_blend_pads_and_truncates(tmp_path):
+    """Test betas are zero-padded or truncated to the blend-shape count."""
+    model_data = _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+    assert model.load_model()
+
+    shapedirs = model_data["shapedirs"]
+    short = model._apply_shape_blend(np.array([1.0]))
+    long = model._apply_shape_blend(np.array([1.0, 0.0, 0.0, 0.0, 5.0, 5.0]))
+
+    assert np.allclose(short, model_data["v_template"] + shapedirs[:, :, 0], atol=1e-4)
+    assert np.allclose(long, short, atol=1e-4)
+
+
+def test_pickle_is_cached_as_npz(tmp_path):
+    """Test the first pickle load writes an .npz that later loads reuse."""
+    model_data = _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    betas = np.array([0.5, -1.0, 2.0, 0.25])
+
+    first = SMPLXModel(model_path=tmp_path)
+    first.use_library = False
+    assert first.load_model()
+    assert (tmp_path / "SMPLX_NEUTRAL.blend-cache.npz").exists()
+
+    # Corrupt the pickle: a second load must come from the cache alone
+    (tmp_path / "SMPLX_NEUTRAL.pkl").write_bytes(b"")
+    second = SMPLXModel(model_path=tmp_path)
+    second.use_library = False
+    assert second.load_model()
+
+    assert np.array_equal(second.model_data["f"], model_data["f"])
+    assert np.allclose(
+        second._apply_shape_blend(betas), first._apply_shape_blend(betas), atol=1e-6
+    )
+
+
+def test_generate_meshes_batched_matches_single(tmp_path):
+    """Test a batched pass yields the same meshes as one call per beta vector."""
+    _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+    betas_batch = np.array([[0.5, -1.0, 2.0, 0.25], [0.0, 1.0, 0.0, -0.5]])
+
+    meshes = model.generate_meshes_batched(betas_batch, scale=[1.0, 1.5])
+
+    assert len(meshes) == 2
+    for mesh, betas, scale in zip(meshes, betas_batch, [1.0, 1.5]):
+        single = model.generate_mesh(betas, scale=scale)
+        assert np.allclose(mesh.vertices, single.vertices, atol=1e-5)
+        assert np.array_equal(mesh.faces, single.faces)
+
+
+def test_generate_mesh_reuses_blend_buffer(tmp_path):
+    """Test meshes built from the shared scratch buffer stay independent."""
+    _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+
+    first = model.generate_mesh(np.array([1.0, 0.0, 0.0, 0.0]))
+    first_vertices = first.vertices.copy()
+    second = model.generate_mesh(np.array([0.0, -1.0, 0.0, 0.0]))
+
+    assert np.array_equal(first.vertices, first_vertices)
+    assert not np.allclose(first.vertices, second.vertices)
+
+
+def test_float16_npz_cache_is_rebuilt(tmp_path):
+    """Test an .npz cache with stale dtypes is replaced from the pickle."""
+    _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+    assert model.load_model()
+
+    npz_path = tmp_path / "SMPLX_NEUTRAL.blend-cache.npz"
+    with np.load(npz_path) as data:
+        stale = {key: data[key] for key in data.files}
+    stale["shapedirs"] = stale["shapedirs"].astype(np.float16)
+    np.savez(npz_path, **stale)
+
+    reloaded = SMPLXModel(model_path=tmp_path)
+    reloaded.use_library = False
+    assert reloaded.load_model()
+
+    assert reloaded.model_data["shapedirs"].dtype == np.float32
+    with np.load(npz_path) as data:
+        assert data["shapedirs"].dtype == np.float32
+
+
+def test_official_npz_model_is_left_untouched(tmp_path):
+    """Test the SMPL-X download's own .npz beside the pickle is never overwritten."""
+    _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    official_path = tmp_path / "SMPLX_NEUTRAL.npz"
+    official = {
+        "v_template": np.zeros((12, 3)),
+        "shapedirs": np.zeros((12, 3, 4)),
+        "posedirs": np.zeros((12, 3, 2)),
+        "weights": np.ones((12, 2)),
+    }
+    np.savez(official_path, **official)
+    before = official_path.read_bytes()
+
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+    assert model.load_model()
+
+    assert official_path.read_bytes() == before
+
+
+def test_foreign_file_at_cache_path_is_not_overwritten(tmp_path):
+    """Test an .npz the loader did not write is ignored rather than replaced."""
+    model_data = _write_model(tmp_path / "SMPLX_NEUTRAL.pkl")
+    foreign_path = tmp_path / "SMPLX_NEUTRAL.blend-cache.npz"
+    np.savez(foreign_path, v_template=np.zeros((12, 3)))
+    before = foreign_path.read_bytes()
+
+    model = SMPLXModel(model_path=tmp_path)
+    model.use_library = False
+    assert model.load_model()
+
+    assert foreign_path.read_bytes() == before
+    assert np.allclose(model.model_data["v_template"], model_data["v_template"], atol=1e-6)
+
+
+class _FakeLibraryModel:
+    """Stand-in for an smplx.SMPLX model built with the default batch_size=1."""
+
+    faces = np.arange(12).reshape(-1, 3)
+
+    def __init__(self, torch):
+        self._torch = torch
+        self.jaw_pose = torch.zeros((1, 3))
+        self.leye_pose = torch.zeros((1, 3))
+        self.reye_pose = torch.zeros((1, 3))
+        self.left_hand_pose = torch.zeros((1, 6))
+        self.right_hand_pose = torch.zeros((1, 6))
+        self.expression = torch.zeros((1, 10))
+
+    def __call__(self, betas, body_pose, global_orient, **kwargs):
+        # Like SMPLX.forward: missing inputs fall back to the batch-1 defaults
+        # and everything is concatenated along the feature axis
+        names = ("jaw_pose", "leye_pose", "reye_pose", "left_hand_pose", "right_hand_pose")
+        poses = [kwargs.get(name, getattr(self, name)) for name in names]
+        self._torch.cat([global_orient, body_pose] + poses, dim=1)
+        shape = self._torch.cat([betas, kwargs.get("expression", self.expression)], dim=-1)
+        vertices = shape[:, :1, None].expand(-1, 4, 3).clone()
+        return type("Output", (), {"vertices": vertices})()
+
+
+def test_generate_meshes_batched_with_library():
+    """Test a batched library forward passes batch-N defaults for every input."""
+    torch = pytest.importorskip("torch")
+    model = SMPLXModel()
+    model.loaded = True
+    model.smplx_model = _FakeLibraryModel(torch)
+    betas_batch = np.array([[1.0] + [0.0] * 9, [2.0] + [0.0] * 9], dtype=np.float32)
+
+    meshes = model.generate_meshes_batched(betas_batch, scale=1.0)
+
+    assert meshes is not None and len(meshes) == 2
+    assert np.allclose(meshes[0].vertices, 1.0)
+    assert np.allclose(meshes[1].vertices, 2.0)
@@ -2,6 +2,28 @@ import React, { useState } from 'react'
 import axios from 'axios'
 import './UploadForm.css'
 
+const POLL_INTERVAL_MS = 500
+const POLL_MAX_ATTEMPTS = 120
+
+// The backend exports the GLB after responding; wait until it can be fetched
+async function waitForAvatar(apiUrl, avatarId) {
+  const url = `${apiUrl}/api/avatar/${avatarId}/glb`
+  for (let attempt = 0; attempt < POLL_MAX_ATTEMPTS; attempt++) {
+    try {
+      await axios.head(url)
+      return
+    } catch (error) {
+      if (error.response?.status !== 404) {
+        // HEAD responses carry no body; GET the error detail (e.g. a failed export)
+        await axios.get(url)
+        throw error
+      }
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+  }
+  throw new Error('Timed out waiting for the avatar to be generated')
+}
+
 function UploadForm({ onAvatarGenerated, onLoadingChange, onError }) {
   const [dexaFile, setDexaFile] = useState(null)
   const [bodyPhoto, setBodyPhoto] = useState(null)
@@ -54,6 +76,9 @@ function UploadForm({ onAvatarGenerated, onLoadingChange, onError }) {
       })
 
       const avatarId = response.data.avatar_id
+      if (response.data.status === 'pending') {
+        await waitForAvatar(apiUrl, avatarId)
+      }
       const glbUrl = `/output/${avatarId}.glb`
       onAvatarGenerated(glbUrl)
     } catch (error) {
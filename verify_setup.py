@@ -1,47 +1,93 @@
 """
 Quick verification script to check if the project is set up correctly.
-Run this before testing the full pipeline.
+Run this before testing the full pipeline. Pass -q/--quiet to print only
+failures and a one-line result.
 """
 import sys
 import os
-from pathlib import Path
+import io
+import json
+import hashlib
+import site
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from importlib.util import find_spec
+
+# Required project layout, built once at import
+_BACKEND_FILES = frozenset({
+    "backend/app/main.py",
+    "backend/app/dexa_parser.py",
+    "backend/app/avatar_generator.py",
+    "backend/app/models.py",
+    "backend/requirements.txt",
+})
+_FRONTEND_FILES = frozenset({
+    "frontend/package.json",
+    "frontend/src/App.jsx",
+    "frontend/src/components/AvatarViewer.jsx",
+    "frontend/src/components/UploadForm.jsx",
+})
+_REQUIRED_DIRS = frozenset({"backend", "frontend", "data", "output", "models"})
+
+# The interpreter can't change while the script runs
+_PY_VERSION_STR = sys.version.split()[0]
+_PY_OK = sys.version_info >= (3, 10)
+
+# Key of the last passing dependency probe, reused until the requirements,
+# the interpreter or its installed packages change
+_CACHE_FILE = ".verify_cache.json"
+_CACHE_INPUTS = ("backend/requirements.txt",)
 
 def check_python_version():
     """Check Python version."""
-    if sys.version_info < (3, 10):
+    if not _PY_OK:
         print("❌ Python 3.10+ required. Current:", sys.version)
         return False
-    print(f"✅ Python version: {sys.version.split()[0]}")
+    print(f"✅ Python version: {_PY_VERSION_STR}")
     return True
 
 def check_backend_dependencies():
     """Check if backend dependencies are installed."""
-    try:
-        import fastapi
-        import pdfplumber
-        import trimesh
-        import mediapipe
-        import numpy
-        print("✅ Backend dependencies installed")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing backend dependency: {e.name}")
+    # find_spec only locates each package; nothing heavy (mediapipe) is imported
+    missing = [
+        name
+        for name in ("fastapi", "pypdfium2", "trimesh", "mediapipe", "numpy")
+        if find_spec(name) is None
+    ]
+    if missing:
+        print(f"❌ Missing backend dependency: {missing[0]}")
         print("   Run: cd backend && pip install -r requirements.txt")
         return False
+    print("✅ Backend dependencies installed")
+    return True
+
+def _report_cached_dependencies():
+    """Stand-in for check_backend_dependencies when nothing has changed since it passed."""
+    print("✅ Backend dependencies installed (unchanged since the last check)")
+    return True
+
+def _check_files(required_files):
+    """Return the required files that don't exist (sorted), listing each directory once."""
+    by_dir = {}
+    for file in required_files:
+        dir_name, base_name = os.path.split(file)
+        by_dir.setdefault(dir_name, set()).add(base_name)
+
+    present = set()
+    for dir_name, names in by_dir.items():
+        try:
+            with os.scandir(dir_name or ".") as entries:
+                found = {entry.name for entry in entries} & names
+        except (FileNotFoundError, NotADirectoryError):
+            found = set()
+        present.update(os.path.join(dir_name, name) for name in found)
+
+    return sorted(required_files - present)
 
 def check_backend_structure():
     """Check if backend files exist."""
-    required_files = [
-        "backend/app/main.py",
-        "backend/app/dexa_parser.py",
-        "backend/app/avatar_generator.py",
-        "backend/app/models.py",
-        "backend/requirements.txt",
-    ]
-    missing = []
-    for file in required_files:
-        if not Path(file).exists():
-            missing.append(file)
+    missing = _check_files(_BACKEND_FILES)
     
     if missing:
         print(f"❌ Missing backend files: {', '.join(missing)}")
@@ -51,16 +97,7 @@ def check_backend_structure():
 
 def check_frontend_structure():
     """Check if frontend files exist."""
-    required_files = [
-        "frontend/package.json",
-        "frontend/src/App.jsx",
-        "frontend/src/components/AvatarViewer.jsx",
-        "frontend/src/components/UploadForm.jsx",
-    ]
-    missing = []
-    for file in required_files:
-        if not Path(file).exists():
-            missing.append(file)
+    missing = _check_files(_FRONTEND_FILES)
     
     if missing:
         print(f"❌ Missing frontend files: {', '.join(missing)}")
@@ -70,65 +107,172 @@ def check_frontend_structure():
 
 def check_sample_data():
     """Check if sample DEXA PDFs exist."""
-    sample_dir = Path("data/samples")
-    pdfs = list(sample_dir.glob("*.pdf"))
-    if not pdfs:
+    try:
+        with os.scandir("data/samples") as entries:
+            # DirEntry.is_file() uses the type scandir already returned
+            count = sum(
+                1
+                for entry in entries
+                if entry.name.endswith(".pdf") and entry.is_file(follow_symlinks=False)
+            )
+    except FileNotFoundError:
+        count = 0
+    if not count:
         print("⚠️  No sample DEXA PDFs found in data/samples/")
         return False
-    print(f"✅ Found {len(pdfs)} sample DEXA PDF(s)")
+    print(f"✅ Found {count} sample DEXA PDF(s)")
     return True
 
 def check_directories():
     """Check if required directories exist."""
-    required_dirs = ["backend", "frontend", "data", "output", "models"]
+    # mkdir is its own existence check: one syscall per directory, and
+    # FileExistsError means there was nothing to do
     missing = []
-    for dir_name in required_dirs:
-        if not Path(dir_name).exists():
+    for dir_name in sorted(_REQUIRED_DIRS):
+        try:
+            os.mkdir(dir_name)
             missing.append(dir_name)
+        except FileExistsError:
+            pass
     
     if missing:
-        print(f"⚠️  Missing directories (will be created): {', '.join(missing)}")
-        for dir_name in missing:
-            Path(dir_name).mkdir(parents=True, exist_ok=True)
+        print(f"⚠️  Missing directories (created): {', '.join(missing)}")
     print("✅ Required directories exist")
     return True
 
-def main():
-    print("=" * 60)
-    print("DEXA to 3D Avatar - Setup Verification")
-    print("=" * 60)
+class _PerThreadStdout:
+    """stdout stand-in that routes each worker thread's prints to its own buffer."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def write(self, text):
+        return getattr(self._local, "buffer", self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+def _run_check(stdout, name, check_func):
+    """Run one check in a worker thread, returning (result, captured output)."""
+    buffer = stdout.capture()
+    print(f"Checking {name}...")
+    try:
+        result = check_func()
+    except Exception as e:
+        print(f"❌ Error checking {name}: {e}")
+        result = False
     print()
+    return result, buffer.getvalue()
+
+def _cache_key():
+    """Fingerprint of the interpreter, the requirements and site-packages' mtimes."""
+    parts = [sys.version, sys.platform]
+    # Installing or removing a package changes its site-packages directory's mtime
+    site_dirs = [*site.getsitepackages(), site.getusersitepackages()]
+    for path in (*_CACHE_INPUTS, *site_dirs):
+        try:
+            parts.append(str(os.stat(path).st_mtime_ns))
+        except OSError:
+            parts.append("missing")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+def _dependencies_cached(key):
+    """Return True if the dependency probe last passed under this key."""
+    try:
+        with open(_CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f).get("key") == key
+    except (OSError, ValueError, AttributeError):
+        return False
+
+def _save_dependencies_key(key):
+    try:
+        with open(_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"key": key}, f)
+    except OSError:
+        pass
+
+def _run_checks(checks, quiet):
+    """Run checks concurrently, printing each one's output in order."""
+    # The checks are independent and mostly wait on the filesystem, so they
+    # run concurrently; each one's output is buffered and printed in order
+    stdout = _PerThreadStdout(sys.stdout)
+    with redirect_stdout(stdout), ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = [
+            executor.submit(_run_check, stdout, name, check_func)
+            for name, check_func in checks
+        ]
+    results = []
+    for (name, _), future in zip(checks, futures):
+        result, output = future.result()
+        if not (quiet and result):
+            sys.stdout.write(output)
+        results.append((name, result))
+    return results
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Quiet mode prints only failing checks' output and a one-line verdict
+    quiet = "-q" in argv or "--quiet" in argv
+    say = (lambda *args: None) if quiet else print
+
+    say("=" * 60)
+    say("DEXA to 3D Avatar - Setup Verification")
+    say("=" * 60)
+    say()
     
-    checks = [
+    # Cheap preconditions run first; if any fails the rest (including the
+    # dependency probe) would only add noise, so they are skipped
+    must_pass = [
         ("Python Version", check_python_version),
         ("Backend Structure", check_backend_structure),
         ("Frontend Structure", check_frontend_structure),
-        ("Backend Dependencies", check_backend_dependencies),
+    ]
+    # Only the dependency probe is cached; the filesystem checks always run
+    key = _cache_key()
+    deps_cached = _dependencies_cached(key)
+    checks = [
+        (
+            "Backend Dependencies",
+            _report_cached_dependencies if deps_cached else check_backend_dependencies,
+        ),
         ("Directories", check_directories),
         ("Sample Data", check_sample_data),
     ]
     
-    results = []
-    for name, check_func in checks:
-        print(f"Checking {name}...")
-        try:
-            result = check_func()
-            results.append((name, result))
-        except Exception as e:
-            print(f"❌ Error checking {name}: {e}")
-            results.append((name, False))
-        print()
+    results = _run_checks(must_pass, quiet)
+    if all(result for _, result in results):
+        results += _run_checks(checks, quiet)
+        if not deps_cached and dict(results)["Backend Dependencies"]:
+            _save_dependencies_key(key)
+    else:
+        # None marks a check that was skipped
+        results += [(name, None) for name, _ in checks]
     
+    failed = [name for name, result in results if result is False]
+    skipped = [name for name, result in results if result is None]
+    all_passed = not failed and not skipped
+
+    if quiet:
+        if all_passed:
+            print("✅ All checks passed")
+        else:
+            print(f"❌ Failed: {', '.join(failed)}")
+            if skipped:
+                print(f"   Skipped: {', '.join(skipped)}")
+        return 0 if all_passed else 1
+
     print("=" * 60)
     print("Summary")
     print("=" * 60)
     
-    all_passed = True
     for name, result in results:
-        status = "✅ PASS" if result else "❌ FAIL"
+        status = "⏭️  SKIP" if result is None else "✅ PASS" if result else "❌ FAIL"
         print(f"{status}: {name}")
-        if not result:
-            all_passed = False
     
     print()
     if all_passed: